@@ -4,12 +4,10 @@ Main Attendance Service for Atlas Edge
 Orchestrates RFID reading, storage, and API synchronization
 """
 
-import json
-import logging
-import time
 import threading
+import zlib
+from collections import deque
 from datetime import datetime
-from pathlib import Path
 import signal
 import sys
 import os
@@ -18,12 +16,18 @@ import os
 from services.rfid_reader import USBRFIDReader
 from services.offline_storage import OfflineStorage
 from services.api_sync import APISync
+from services.config import load_config
+from services.logging_setup import get_logger
+
+_BANNER = "=" * 60
 
 class AttendanceService:
-    def __init__(self, config_path='config/config.json'):
+    def __init__(self, config_path='config/config.json', device_override=None):
         self.config = self._load_config(config_path)
         self.running = False
         self.setup_logging()
+        # Decorative separator lines are off by default to keep journald output compact
+        self.verbose_banners = self.config.get('logging', {}).get('verbose_banners', False)
 
         # Initialize services
         self.logger.info("Initializing Atlas Edge services...")
@@ -32,9 +36,11 @@ class AttendanceService:
         rfid_config = self.config.get('rfid', {})
         device_path = rfid_config.get('device_path', None)
 
-        self.rfid_reader = USBRFIDReader(config_path, device_path=device_path)
-        self.storage = OfflineStorage(config_path)
-        self.api_sync = APISync(config_path)
+        # Services share the already-parsed config instead of re-reading the file
+        self.rfid_reader = USBRFIDReader(config_path, device_path=device_override or device_path,
+                                         config=self.config)
+        self.storage = OfflineStorage(config_path, config=self.config)
+        self.api_sync = APISync(config_path, config=self.config)
 
         # Sync configuration (from sync section, fallback to server section for backwards compat)
         sync_config = self.config.get('sync', {})
@@ -45,27 +51,46 @@ class AttendanceService:
         self.cleanup_after_sync = self.config.get('storage', {}).get('cleanup_after_sync', True)
         self.last_sync = None
 
+        # Scanned records are staged in memory and written to storage in bulk
+        storage_config = self.config.get('storage', {})
+        self.flush_interval = storage_config.get('flush_interval_ms', 250) / 1000
+        self.flush_batch_size = storage_config.get('flush_batch_size', 50)
+        self.max_pending_records = storage_config.get('max_pending_records', 1000)
+        self._pending = deque()
+        self._pending_lock = threading.Lock()
+        self._pending_event = threading.Event()
+        self._flush_lock = threading.Lock()
+
+        # Unsynced record count maintained in memory so scans skip the COUNT query
+        self._count_lock = threading.Lock()
+        self._unsynced_count = 0
+        self._refresh_unsynced_count()
+
+        # Set by stop() to wake the periodic sync thread immediately
+        self._stop_event = threading.Event()
+        self._sync_thread = None
+
         # Setup signal handlers
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
     
     def _load_config(self, config_path):
         """Load configuration from JSON file"""
-        with open(config_path, 'r') as f:
-            return json.load(f)
+        return load_config(config_path)
     
     def setup_logging(self):
         """Setup logging configuration"""
-        Path('logs').mkdir(exist_ok=True)
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.StreamHandler()
-            ]
-        )
-        self.logger = logging.getLogger('AttendanceService')
+        self.logger = get_logger('AttendanceService')
     
+    def _banner(self, title=None):
+        """Log a section header, framed by separator lines when verbose_banners is set"""
+        if self.verbose_banners:
+            self.logger.info(_BANNER)
+        if title:
+            self.logger.info(title)
+        if self.verbose_banners:
+            self.logger.info(_BANNER)
+
     def _signal_handler(self, signum, frame):
         """Handle shutdown signals gracefully"""
         self.logger.info(f"Received signal {signum}, shutting down...")
@@ -77,28 +102,39 @@ class AttendanceService:
         Handle new attendance record from RFID reader.
 
         Batch-first approach:
-        1. Always save to local storage first (offline-first)
-        2. If immediate_sync is enabled and backend is online, sync right away
+        1. Always stage for local storage first (offline-first); staged
+           records are flushed in bulk by the flush thread
+        2. If immediate_sync is enabled and backend is online, flush and sync right away
         3. Otherwise, records will be synced in batches at the next sync interval
         """
-        self.logger.info("=" * 60)
-        self.logger.info(f"ATTENDANCE LOGGED")
-        self.logger.info(f"Card ID: {record['card_id']}")
-        self.logger.info(f"Time: {datetime.fromisoformat(record['timestamp']).strftime('%Y-%m-%d %H:%M:%S')}")
-        self.logger.info(f"Location: {record['location']}")
-        self.logger.info("=" * 60)
+        # Lazy %-formatting; the ISO timestamp is logged as-is
+        self.logger.info("Attendance logged: card=%s time=%s location=%s",
+                         record['card_id'], record['timestamp'], record['location'])
+
+        # Always stage for offline storage first (batch-first approach)
+        with self._pending_lock:
+            self._pending.append(record)
+            staged = len(self._pending)
+        self._adjust_unsynced_count(1)
 
-        # Always save to offline storage first (batch-first approach)
-        self.storage.add_record(record)
-        self.logger.info("Saved to local storage")
+        if staged >= self.max_pending_records:
+            # Flush thread is falling behind, spill to storage on this thread
+            self._flush_pending()
+        elif staged >= self.flush_batch_size:
+            self._pending_event.set()
+        self.logger.info("Queued for local storage")
 
         # Check if immediate sync is enabled
         if self.immediate_sync:
+            # The record must be in storage before it can be marked as synced
+            self._flush_pending()
             # Try to send to backend immediately if online
-            if self.api_sync.check_connection():
-                success = self.api_sync.send_attendance(record)
+            if self.api_sync.is_online_cached():
+                # No retries on the scan path; a failure falls back to the batch sync
+                success = self.api_sync.send_attendance(record, max_retries=0)
                 if success:
                     self.storage.mark_as_synced([record['timestamp']])
+                    self._adjust_unsynced_count(-1)
                     self.logger.info("Synced to backend immediately")
                 else:
                     self.logger.warning("Failed to sync immediately, will retry in batch")
@@ -106,45 +142,93 @@ class AttendanceService:
                 self.logger.info("Backend offline, will sync in batch later")
         else:
             # Batch mode: show pending count
-            stats = self.storage.get_stats()
-            self.logger.info(f"Pending sync: {stats['unsynced_records']} records (next sync in ~{self.sync_interval}s)")
-
-        self.logger.info("")  # Empty line for readability
+            self.logger.info("Pending sync: %d records (next sync in ~%ss)",
+                             self._unsynced_count, self.sync_interval)
     
+    def _adjust_unsynced_count(self, delta):
+        """Apply a change to the cached unsynced record count"""
+        with self._count_lock:
+            self._unsynced_count = max(0, self._unsynced_count + delta)
+
+    def _refresh_unsynced_count(self):
+        """Re-validate the cached unsynced count against storage"""
+        with self._pending_lock:
+            staged = len(self._pending)
+        count = self.storage.count_unsynced() + staged
+        with self._count_lock:
+            self._unsynced_count = count
+        return count
+
+    def _flush_pending(self):
+        """Write all staged records to storage in one transaction"""
+        with self._flush_lock:
+            with self._pending_lock:
+                if not self._pending:
+                    return 0
+                records = list(self._pending)
+                self._pending.clear()
+
+            self.storage.add_records_bulk(records)
+            return len(records)
+
+    def _flush_loop(self):
+        """Flush staged records every flush_interval or when a batch fills up"""
+        while self.running:
+            self._pending_event.wait(self.flush_interval)
+            self._pending_event.clear()
+            try:
+                self._flush_pending()
+            except Exception as e:
+                self.logger.error(f"Error flushing staged records: {e}")
+
     def sync_offline_records(self):
         """
         Sync pending offline records to backend in chunks.
 
         This method:
         1. Checks if backend is online
-        2. Gets all unsynced records
-        3. Sends them in configurable chunk sizes
+        2. Streams unsynced records from storage in configurable chunk sizes
+        3. Sends each chunk as it is read
         4. Marks successful records as synced
         5. Optionally cleans up synced records
         """
-        if not self.api_sync.check_connection():
+        if not self.api_sync.is_online_cached():
             self.logger.debug("Backend offline, skipping sync")
             return {'synced': 0, 'failed': 0, 'skipped': True}
 
-        unsynced = self.storage.get_unsynced_records()
-        if not unsynced:
+        pending = self.storage.count_unsynced()
+        if not pending:
             self.logger.debug("No unsynced records to sync")
             return {'synced': 0, 'failed': 0, 'skipped': False}
 
         # Check minimum records threshold
-        if len(unsynced) < self.min_records_for_sync:
-            self.logger.debug(f"Only {len(unsynced)} records, minimum is {self.min_records_for_sync}")
+        if pending < self.min_records_for_sync:
+            self.logger.debug(f"Only {pending} records, minimum is {self.min_records_for_sync}")
             return {'synced': 0, 'failed': 0, 'skipped': True}
 
-        self.logger.info(f"Syncing {len(unsynced)} offline records in chunks of {self.batch_size}...")
+        self.logger.info(f"Syncing {pending} offline records in chunks of {self.batch_size}...")
+
+        # Stream chunks straight from storage instead of loading every record
+        result = self.api_sync.sync_from_iterator(self.storage.iter_unsynced_records(self.batch_size))
+
+        # Mark successful records as synced and clean up in one transaction
+        self.storage.begin()
+        try:
+            if result['synced_ids']:
+                self.storage.mark_as_synced(result['synced_ids'])
+                self.logger.info(f"Marked {len(result['synced_ids'])} records as synced")
 
-        # Use chunk-based sync from api_sync
-        result = self.api_sync.sync_records_in_chunks(unsynced, self.batch_size)
+            # Clean up synced records if enabled
+            if self.cleanup_after_sync and result['success'] > 0:
+                removed = self.storage.clear_synced_records()
+                if removed > 0:
+                    self.logger.info(f"Cleared {removed} synced records from local storage")
 
-        # Mark successful records as synced
-        if result['synced_ids']:
-            self.storage.mark_as_synced(result['synced_ids'])
-            self.logger.info(f"Marked {len(result['synced_ids'])} records as synced")
+            self.storage.commit()
+        except Exception:
+            self.storage.rollback()
+            raise
+        self._adjust_unsynced_count(-len(result['synced_ids']))
 
         # Log any errors
         if result['errors']:
@@ -156,12 +240,6 @@ class AttendanceService:
         # Update last sync time
         self.last_sync = datetime.now()
 
-        # Clean up synced records if enabled
-        if self.cleanup_after_sync and result['success'] > 0:
-            removed = self.storage.clear_synced_records()
-            if removed > 0:
-                self.logger.info(f"Cleared {removed} synced records from local storage")
-
         self.logger.info(f"Sync complete: {result['success']} synced, {result['failed']} failed")
 
         return {
@@ -172,16 +250,20 @@ class AttendanceService:
         }
     
     def periodic_sync(self):
-        """Periodically sync offline records"""
-        while self.running:
+        """Periodically sync offline records until the service is stopped"""
+        # Stable per-device phase offset in [0, sync_interval) so a fleet
+        # started together does not hit the backend at the same moment
+        device_id = self.config['device']['id']
+        delay = zlib.crc32(device_id.encode('utf-8')) % max(1, int(self.sync_interval))
+
+        while not self._stop_event.wait(delay):
+            delay = self.sync_interval
             try:
-                time.sleep(self.sync_interval)
                 self.logger.info("Running periodic sync...")
                 self.sync_offline_records()
                 
-                # Send heartbeat
-                if self.api_sync.check_connection():
-                    self.api_sync.heartbeat()
+                # Send heartbeat; it doubles as the backend health probe
+                self.api_sync.heartbeat()
                     
             except Exception as e:
                 self.logger.error(f"Error in periodic sync: {e}")
@@ -189,9 +271,7 @@ class AttendanceService:
     def start(self):
         """Start the attendance service"""
         self.logger.info("")
-        self.logger.info("=" * 60)
-        self.logger.info("🚀 ATLAS EDGE ATTENDANCE SERVICE")
-        self.logger.info("=" * 60)
+        self._banner("ATLAS EDGE ATTENDANCE SERVICE")
         self.logger.info(f"Device ID: {self.config['device']['id']}")
         self.logger.info(f"Device Name: {self.config['device']['name']}")
         self.logger.info(f"Location: {self.config['device']['location']}")
@@ -199,36 +279,42 @@ class AttendanceService:
         # Display RFID reader info
         rfid_config = self.config.get('rfid', {})
         reader_type = rfid_config.get('reader_type', 'USB')
-        device_path = rfid_config.get('device_path', 'stdin')
+        device_path = self.rfid_reader.device_path or 'auto-detect'
         self.logger.info(f"Reader Type: {reader_type}")
         self.logger.info(f"Reader Device: {device_path}")
         
-        self.logger.info("=" * 60)
+        self._banner()
         self.logger.info("")
         
         self.running = True
         
         # Check backend connection on startup
-        self.logger.info("🔍 Checking backend connection...")
+        self.logger.info("Checking backend connection...")
         if self.api_sync.check_connection():
-            self.logger.info("✓ Backend connection established")
-            self.logger.info("📡 Registering device...")
+            self.logger.info("[OK] Backend connection established")
+            self.logger.info("Registering device...")
             self.api_sync.register_device()
         else:
-            self.logger.warning("⚠ Backend unreachable, operating in OFFLINE mode")
+            self.logger.warning("[WARN] Backend unreachable, operating in OFFLINE mode")
         
         # Display storage stats
         stats = self.storage.get_stats()
         self.logger.info("")
-        self.logger.info("📊 Storage Status:")
+        self.logger.info("Storage Status:")
         self.logger.info(f"   Total Records: {stats['total_records']}")
         self.logger.info(f"   Synced: {stats['synced_records']}")
         self.logger.info(f"   Pending: {stats['unsynced_records']}")
+        self.logger.info(f"   Journal mode: {stats['journal_mode']}")
         self.logger.info("")
         
+        # Start flushing staged records in background thread
+        flush_thread = threading.Thread(target=self._flush_loop, daemon=True)
+        flush_thread.start()
+
         # Start periodic sync in background thread
-        sync_thread = threading.Thread(target=self.periodic_sync, daemon=True)
-        sync_thread.start()
+        self._stop_event.clear()
+        self._sync_thread = threading.Thread(target=self.periodic_sync, daemon=True)
+        self._sync_thread.start()
         self.logger.info("Periodic sync thread started")
         self.logger.info(f"   Mode: {'Immediate + Batch' if self.immediate_sync else 'Batch only'}")
         self.logger.info(f"   Sync interval: {self.sync_interval} seconds")
@@ -237,15 +323,13 @@ class AttendanceService:
         self.logger.info("")
         
         # Start RFID reading (blocking call)
-        self.logger.info("=" * 60)
-        self.logger.info("👉 READY TO SCAN CARDS")
-        self.logger.info("=" * 60)
+        self._banner("READY TO SCAN CARDS")
         self.logger.info("")
         
         try:
             self.rfid_reader.start_reading(self.handle_attendance)
         except Exception as e:
-            self.logger.error(f"❌ Error in RFID reader: {e}")
+            self.logger.error(f"[ERROR] Error in RFID reader: {e}")
             import traceback
             self.logger.error(traceback.format_exc())
             self.stop()
@@ -253,21 +337,33 @@ class AttendanceService:
     def stop(self):
         """Stop the attendance service"""
         self.logger.info("")
-        self.logger.info("=" * 60)
-        self.logger.info("🛑 Stopping Atlas Edge Attendance Service...")
-        self.logger.info("=" * 60)
+        self._banner("Stopping Atlas Edge Attendance Service...")
         self.running = False
+
+        # Wake the periodic sync thread and let an in-flight sync finish
+        self._stop_event.set()
+        if self._sync_thread and self._sync_thread is not threading.current_thread():
+            self._sync_thread.join(timeout=30)
+
+        # Write any staged records before the final sync
+        try:
+            flushed = self._flush_pending()
+            if flushed:
+                self.logger.info(f"Flushed {flushed} staged records")
+        except Exception as e:
+            self.logger.error(f"Error flushing staged records: {e}")
         
         # Final sync before shutdown
         try:
-            self.logger.info("📤 Performing final sync...")
+            self.logger.info("Performing final sync...")
             self.sync_offline_records()
         except Exception as e:
             self.logger.error(f"Error during final sync: {e}")
         
         # Cleanup
         self.rfid_reader.cleanup()
-        self.logger.info("✓ Service stopped successfully")
+        self.api_sync.close()
+        self.logger.info("[OK] Service stopped successfully")
         self.logger.info("")
     
     def get_status(self):
@@ -279,6 +375,7 @@ class AttendanceService:
             'last_backend_check': self.api_sync.last_check.isoformat() if self.api_sync.last_check else None,
             'last_sync': self.last_sync.isoformat() if self.last_sync else None,
             'storage': stats,
+            'pending_sync': self._unsynced_count,
             'sync_config': {
                 'mode': 'immediate' if self.immediate_sync else 'batch',
                 'batch_size': self.batch_size,
@@ -292,7 +389,9 @@ class AttendanceService:
     def force_sync(self):
         """Force an immediate sync of all pending records"""
         self.logger.info("Force sync requested...")
-        return self.sync_offline_records()
+        result = self.sync_offline_records()
+        self._refresh_unsynced_count()
+        return result
 
 if __name__ == "__main__":
     import argparse
@@ -300,20 +399,8 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Atlas Edge Attendance Service')
     parser.add_argument('--config', type=str, default='config/config.json', 
                        help='Path to configuration file')
-    parser.add_argument('--device', type=str, help='Override RFID device path')
+    parser.add_argument('--device', type=str, help='Override RFID device path for this run')
     args = parser.parse_args()
     
-    # Override device path if specified
-    if args.device:
-        import json
-        with open(args.config, 'r') as f:
-            config = json.load(f)
-        if 'rfid' not in config:
-            config['rfid'] = {}
-        config['rfid']['device_path'] = args.device
-        with open(args.config, 'w') as f:
-            json.dump(config, f, indent=2)
-        print(f"Updated device path to: {args.device}")
-    
-    service = AttendanceService(args.config)
+    service = AttendanceService(args.config, device_override=args.device)
     service.start()
\ No newline at end of file
@@ -2,14 +2,98 @@
 # This is a reference implementation showing the required endpoints
 
 from flask import Flask, request, jsonify
+from collections import deque
 from datetime import datetime
+import bisect
+import heapq
+import itertools
 import json
+import threading
+import zlib
+
+from services import json_provider
 
 app = Flask(__name__)
+# orjson is optional: faster encoding of large batch responses, same output rules
+json_provider.install(app)
 
 # In-memory storage (use a real database in production)
 devices = {}
-attendance_records = []
+# Records kept in memory, in arrival order; the oldest arrivals are
+# dropped (here and from the index) once MAX_RECORDS are held
+MAX_RECORDS = 100_000
+attendance_records = deque()
+# Secondary index: device_id -> that device's records sorted by timestamp.
+# Offline devices upload old batches late, so arrival order is not time order
+records_by_device = {}
+# device_id -> sort keys parallel to records_by_device, for bisect
+_keys_by_device = {}
+# Guards the ring and the index, which are updated together
+_records_lock = threading.Lock()
+# Record ids; next() on a count is atomic under the GIL
+_id_counter = itertools.count(1)
+
+def _sort_key(record):
+    """Timestamp order; equal timestamps keep arrival order when listed newest first"""
+    return (record['timestamp'], -record['id'])
+
+def _store_records(records):
+    """Add records to the ring and the device index, evicting the oldest arrivals when full"""
+    with _records_lock:
+        for record in records:
+            if len(attendance_records) >= MAX_RECORDS:
+                _unindex(attendance_records.popleft())
+            attendance_records.append(record)
+
+            device_id = record['device_id']
+            key = _sort_key(record)
+            keys = _keys_by_device.setdefault(device_id, [])
+            i = bisect.bisect(keys, key)  # the end, for records sent in time order
+            keys.insert(i, key)
+            records_by_device.setdefault(device_id, []).insert(i, record)
+
+def _unindex(record):
+    """Remove an evicted record from the device index"""
+    device_id = record['device_id']
+    keys = _keys_by_device[device_id]
+    i = bisect.bisect_left(keys, _sort_key(record))
+    del keys[i]
+    del records_by_device[device_id][i]
+    if not keys:
+        del _keys_by_device[device_id]
+        del records_by_device[device_id]
+
+# Largest request body accepted (bulk syncs from many devices at once)
+MAX_REQUEST_BYTES = 5 * 1024 * 1024
+
+# Largest body accepted after gzip decompression
+MAX_DECOMPRESSED_BYTES = 10 * MAX_REQUEST_BYTES
+
+@app.before_request
+def limit_request_size():
+    """Reject oversized bodies before they are buffered"""
+    if request.content_length is not None and request.content_length > MAX_REQUEST_BYTES:
+        return jsonify({'error': 'Request body too large'}), 413
+
+def get_json_body():
+    """
+    Parse the JSON body, accepting gzip-compressed uploads from edge devices.
+    Returns None if the body is too large once decompressed, and an empty
+    dict (which callers reject as missing data) if it is not valid gzip
+    or JSON.
+    """
+    if request.headers.get('Content-Encoding', '').lower() != 'gzip':
+        return request.json
+
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    try:
+        raw = decompressor.decompress(request.get_data(), MAX_DECOMPRESSED_BYTES)
+        if decompressor.unconsumed_tail:
+            return None
+        data = app.json.loads(raw)
+    except (zlib.error, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
 
 @app.route('/api/health', methods=['GET'])
 def health():
@@ -67,7 +151,7 @@ def create_attendance():
     
     # Add to records
     record = {
-        'id': len(attendance_records) + 1,
+        'id': next(_id_counter),
         'card_id': data['card_id'],
         'timestamp': data['timestamp'],
         'device_id': data['device_id'],
@@ -76,23 +160,25 @@ def create_attendance():
         'created_at': datetime.utcnow().isoformat()
     }
     
-    attendance_records.append(record)
+    _store_records((record,))
     
     return jsonify({'message': 'Attendance recorded', 'record': record}), 201
 
 @app.route('/api/attendance/batch', methods=['POST'])
 def create_attendance_batch():
     """Create multiple attendance records"""
-    data = request.json
+    data = get_json_body()
+    if data is None:
+        return jsonify({'error': 'Request body too large'}), 413
     records = data.get('records', [])
     
     if not records:
         return jsonify({'error': 'No records provided'}), 400
     
-    created = []
-    for record_data in records:
+    created = [None] * len(records)
+    for i, record_data in enumerate(records):
         record = {
-            'id': len(attendance_records) + 1,
+            'id': next(_id_counter),
             'card_id': record_data['card_id'],
             'timestamp': record_data['timestamp'],
             'device_id': record_data['device_id'],
@@ -100,8 +186,8 @@ def create_attendance_batch():
             'location': record_data.get('location'),
             'created_at': datetime.utcnow().isoformat()
         }
-        attendance_records.append(record)
-        created.append(record)
+        created[i] = record
+    _store_records(created)
     
     return jsonify({
         'message': 'Batch created successfully',
@@ -115,17 +201,25 @@ def get_attendance():
     device_id = request.args.get('device_id')
     limit = request.args.get('limit', 100, type=int)
     
-    records = attendance_records
-    
-    if device_id:
-        records = [r for r in records if r['device_id'] == device_id]
-    
-    # Sort by timestamp descending
-    records = sorted(records, key=lambda x: x['timestamp'], reverse=True)
-    
+    with _records_lock:
+        if device_id:
+            # Newest first is the device's index walked backwards
+            records = records_by_device.get(device_id, ())
+            newest = itertools.islice(reversed(records), max(limit, 0))
+            total = len(records)
+        else:
+            # Merge the devices' indexes newest first; only `limit` records are visited
+            newest = itertools.islice(
+                heapq.merge(*(reversed(r) for r in records_by_device.values()),
+                            key=_sort_key, reverse=True),
+                max(limit, 0)
+            )
+            total = len(attendance_records)
+        page = list(newest)
+
     return jsonify({
-        'records': records[:limit],
-        'total': len(records)
+        'records': page,
+        'total': total
     })
 
 @app.route('/api/devices', methods=['GET'])
@@ -137,4 +231,5 @@ def get_devices():
     })
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Development only; use wsgi.py with gunicorn for concurrent devices
+    app.run(host='0.0.0.0', port=5000)
@@ -13,21 +13,123 @@ Updated to work with Atlas backend endpoints:
 Sync modes:
 - batch: Records are stored locally and synced in chunks at intervals (default)
 - immediate: Each record is sent immediately (fallback to batch if offline)
+
+Compression:
+With sync.compress_batches enabled, /attendance/batch bodies larger than
+COMPRESS_MIN_BYTES are gzipped and sent with Content-Encoding: gzip; the
+backend must decompress request bodies. Responses are requested with
+Accept-Encoding: gzip (the requests default).
 """
 
-import json
+import gzip
 import logging
+import random
 import requests
+import threading
 import time
-from datetime import datetime
-from typing import List, Dict, Optional
-from pathlib import Path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from datetime import datetime, timezone
+from typing import List, Dict, Iterable, Optional, Tuple
+
+try:
+    from services import fastjson
+    from services.config import load_config
+    from services.logging_setup import get_logger
+except ImportError:  # Run directly as a script
+    import fastjson
+    from config import load_config
+    from logging_setup import get_logger
+
+# Smaller batch bodies are sent uncompressed; gzip would not pay for itself
+COMPRESS_MIN_BYTES = 1024
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of sending a request while the circuit breaker is open"""
+
+
+class _CircuitBreaker:
+    """
+    Client-side circuit breaker for backend calls.
+
+    closed -> open after `threshold` consecutive failures. Once open, calls
+    are rejected until `reset_after` seconds pass; the circuit then goes
+    half_open and lets a single probe through, which closes it on success
+    or re-opens it on failure.
+    """
+
+    def __init__(self, threshold: int = 5, reset_after: float = 60.0):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.state = 'closed'
+        self.failure_count = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return True if a request may be sent now"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open':
+                if time.monotonic() - self.opened_at < self.reset_after:
+                    return False
+                self.state = 'half_open'
+                self._probing = False
+            if self._probing:
+                return False
+            self._probing = True
+            return True
+
+    def on_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failure_count = 0
+            self._probing = False
+
+    def on_failure(self) -> bool:
+        """Record a failure; returns True if this failure opened the circuit"""
+        with self._lock:
+            self.failure_count += 1
+            self._probing = False
+            if self.state == 'half_open' or (self.state == 'closed' and self.failure_count >= self.threshold):
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
 
 class APISync:
-    def __init__(self, config_path='config/config.json'):
-        self.config = self._load_config(config_path)
+    def __init__(self, config_path='config/config.json', config=None):
+        self.config = config if config is not None else self._load_config(config_path)
         self.api_url = self.config['server']['api_url']
         self.api_key = self.config['server']['api_key']
+
+        # Endpoint URLs, built once
+        self._url_health = f"{self.api_url}/device-api/health"
+        self._url_heartbeat = f"{self.api_url}/device-api/heartbeat"
+        self._url_register = f"{self.api_url}/device-api/register"
+        self._url_info = f"{self.api_url}/device-api/info"
+        self._url_checkin = f"{self.api_url}/attendance/auto-checkin"
+        self._url_batch = f"{self.api_url}/attendance/batch"
+
+        # Reported as registered_at; registration only confirms this process
+        self._started_at = datetime.now(timezone.utc).isoformat()
+
+        # Device identity and request headers never change at runtime
+        device_config = self.config['device']
+        self._device_id = device_config['id']
+        self._device_name = device_config['name']
+        self._device_location = device_config['location']
+        self._headers = {
+            'Content-Type': 'application/json',
+            'Authorization': f'Bearer {self.api_key}',
+            'X-Device-Id': self._device_id
+        }
         self.timeout = self.config['server']['timeout']
 
         # Sync configuration
@@ -39,126 +141,263 @@ class APISync:
         self.retry_failed_after = sync_config.get('retry_failed_after', 60)
         self.max_retries = sync_config.get('max_retries', 3)
         self.immediate_sync = sync_config.get('immediate_sync', False)
+        # Backend must accept Content-Encoding: gzip on /attendance/batch
+        self.compress_batches = sync_config.get('compress_batches', False)
+        # Chunk uploads in flight at once during a chunked sync
+        self.max_concurrency = max(1, sync_config.get('max_concurrency', 4))
+        self._breaker = _CircuitBreaker(
+            threshold=sync_config.get('breaker_threshold', 5),
+            reset_after=sync_config.get('breaker_reset_after', 60)
+        )
 
         # State tracking
         self.is_online = False
         self.last_check = None
+        self._online_cached = (None, False)  # (monotonic time of check, result)
         self.last_sync = None
+        # Records that exhausted max_retries (they stay in offline storage
+        # and are retried on later syncs); retry_counts is keyed by timestamp
         self.failed_records = []
         self.retry_counts = {}
+        self._retry_lock = threading.Lock()
+
+        # Background health probing, see start_health_monitor()
+        self._monitor_thread = None
+        self._monitor_stop = threading.Event()
 
         self.setup_logging()
+        self._session = self._create_session()
 
     def _load_config(self, config_path):
         """Load configuration from JSON file"""
-        with open(config_path, 'r') as f:
-            return json.load(f)
+        return load_config(config_path)
 
     def setup_logging(self):
         """Setup logging configuration"""
-        # Create logs directory if it doesn't exist
-        Path('logs').mkdir(exist_ok=True)
-
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('logs/api_sync.log'),
-                logging.StreamHandler()
-            ]
+        self.logger = get_logger('APISync', 'api_sync.log')
+
+    def _create_session(self) -> requests.Session:
+        """
+        Create a pooled HTTP session so consecutive requests (chunked syncs,
+        heartbeats, health checks) reuse the same keep-alive connection.
+        """
+        session = requests.Session()
+        # Auth and device headers ride on every request from the session
+        session.headers.update(self._get_headers())
+        # One pooled connection per concurrent chunk upload, plus headroom for
+        # heartbeats and health checks issued alongside a sync. The adapter
+        # does not retry; callers retry with jittered backoff
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_concurrency + 4)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def start_health_monitor(self, interval: float):
+        """
+        Probe the backend every `interval` seconds on a daemon thread, so
+        is_online and last_check stay current without callers probing.
+        Calling it again while running does nothing; close() stops it.
+        """
+        if self._monitor_thread and self._monitor_thread.is_alive():
+            return
+        self._monitor_stop.clear()
+        self._monitor_thread = threading.Thread(
+            target=self._monitor_loop, args=(interval,), name='APISyncHealth', daemon=True
         )
-        self.logger = logging.getLogger('APISync')
+        self._monitor_thread.start()
+
+    def _monitor_loop(self, interval: float):
+        """Run check_connection() until close() is called"""
+        while True:
+            try:
+                self.check_connection()
+            except Exception as e:
+                self.logger.error("Health monitor probe failed: %s", e)
+            if self._monitor_stop.wait(interval):
+                return
+
+    def close(self):
+        """Stop the health monitor, if running, and release pooled connections"""
+        self._monitor_stop.set()
+        self._session.close()
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request to the backend through the circuit breaker.
+        Raises CircuitOpenError without touching the network while the
+        circuit is open. Transport errors, 429 and 5xx count as failures.
+        """
+        if not self._breaker.allow():
+            raise CircuitOpenError(f"Circuit open, not calling {url}")
+
+        try:
+            response = self._session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            self._record_failure()
+            raise
+
+        if response.status_code == 429 or response.status_code >= 500:
+            self._record_failure()
+        else:
+            self._breaker.on_success()
+        return response
+
+    def _record_failure(self):
+        """Count a failed backend call, logging when it opens the circuit"""
+        if self._breaker.on_failure():
+            self.logger.warning("Backend failing, circuit opened for %ss after %d consecutive failures",
+                                self._breaker.reset_after, self._breaker.failure_count)
 
     def _get_headers(self):
         """Get API request headers"""
-        return {
-            'Content-Type': 'application/json',
-            'Authorization': f'Bearer {self.api_key}',
-            'X-Device-Id': self.config['device']['id']
-        }
+        return self._headers
 
     def check_connection(self) -> bool:
         """
         Check if backend API is reachable using device-api health endpoint.
         This endpoint authenticates the device and confirms connectivity.
         """
+        # Repeated results (e.g. from the health monitor) are logged at
+        # DEBUG; only the first check and changes of state are reported
+        was_online = self.is_online if self.last_check is not None else None
         try:
-            response = requests.get(
-                f"{self.api_url}/device-api/health",
-                headers=self._get_headers(),
+            response = self._request(
+                'GET', self._url_health,
                 timeout=self.timeout
             )
             self.is_online = response.status_code == 200
-            self.last_check = datetime.utcnow()
+            self.last_check = datetime.now(timezone.utc)
+            self._online_cached = (time.monotonic(), self.is_online)
 
             if self.is_online:
-                result = response.json()
-                self.logger.info(f"Backend API is reachable. Device status: {result.get('device', {}).get('status', 'unknown')}")
+                # Status code is all we need; the body is not decoded
+                level = logging.DEBUG if was_online else logging.INFO
+                self.logger.log(level, "Backend API is reachable")
             else:
-                self.logger.warning(f"Backend API returned status {response.status_code}")
+                level = logging.DEBUG if was_online is False else logging.WARNING
+                self.logger.log(level, "Backend API returned status %s", response.status_code)
 
             return self.is_online
         except requests.exceptions.RequestException as e:
             self.is_online = False
-            self.last_check = datetime.utcnow()
-            self.logger.warning(f"Backend API unreachable: {e}")
+            self.last_check = datetime.now(timezone.utc)
+            self._online_cached = (time.monotonic(), False)
+            level = logging.DEBUG if was_online is False else logging.WARNING
+            self.logger.log(level, "Backend API unreachable: %s", e)
             return False
 
-    def send_attendance(self, record: Dict) -> bool:
+    def is_online_cached(self, ttl: float = 2.0) -> bool:
+        """
+        Return the last known backend state, only probing the health
+        endpoint again when the previous check is older than ttl seconds.
+        """
+        checked_at, online = self._online_cached
+        if checked_at is not None and time.monotonic() - checked_at < ttl:
+            return online
+        return self.check_connection()
+
+    def _mark_online(self):
+        """Record that an authenticated request just succeeded"""
+        self.is_online = True
+        self.last_check = datetime.now(timezone.utc)
+        self._online_cached = (time.monotonic(), True)
+
+    def _invalidate_online_cache(self):
+        """Force the next is_online_cached() call to probe the backend"""
+        self._online_cached = (None, self.is_online)
+
+    def send_attendance(self, record: Dict, max_retries: Optional[int] = None) -> bool:
         """
         Send single attendance record to backend.
         Maps Edge format (card_id, timestamp) to backend format (cardNumber, date).
+        Transport errors, 429 and 5xx are retried up to max_retries times
+        (default: sync.max_retries) with jittered backoff.
         """
-        try:
-            # Map Edge format to backend format
-            backend_record = {
-                'cardNumber': record['card_id'],
-                'date': record['timestamp'],
-                'location': record.get('location', self.config['device']['location'])
-            }
-
-            response = requests.post(
-                f"{self.api_url}/attendance/auto-checkin",
-                json=backend_record,
-                headers=self._get_headers(),
-                timeout=self.timeout
-            )
+        if max_retries is None:
+            max_retries = self.max_retries
+
+        # Map Edge format to backend format
+        backend_record = {
+            'cardNumber': record['card_id'],
+            'date': record['timestamp'],
+            'location': record.get('location', self._device_location)
+        }
+        body = fastjson.dumps(backend_record)
+
+        for attempt in range(max_retries + 1):
+            if attempt:
+                time.sleep(self._backoff(attempt - 1))
+
+            try:
+                response = self._request(
+                    'POST', self._url_checkin,
+                    data=body,
+                    timeout=self.timeout
+                )
+            except CircuitOpenError as e:
+                self.logger.error("Error syncing attendance: %s", e)
+                return False
+            except requests.exceptions.RequestException as e:
+                self._invalidate_online_cache()
+                self.logger.error("Error syncing attendance: %s", e)
+                continue
 
             if response.status_code in [200, 201]:
-                result = response.json()
-                self.logger.info(f"Attendance synced successfully: {record['card_id']} - {result.get('status', 'unknown')}")
+                # The body is only used for the log line
+                if self.logger.isEnabledFor(logging.INFO):
+                    try:
+                        status = fastjson.loads(response.content).get('status', 'unknown')
+                    except ValueError:
+                        status = 'unknown'
+                    self.logger.info("Attendance synced successfully: %s - %s", record['card_id'], status)
                 return True
-            else:
-                error_msg = "Unknown error"
-                try:
-                    error_data = response.json()
-                    error_msg = error_data.get('message', str(response.status_code))
-                except:
-                    error_msg = f"Status {response.status_code}"
-                self.logger.error(f"Failed to sync attendance: {error_msg}")
+
+            error_msg = "Unknown error"
+            try:
+                error_data = fastjson.loads(response.content)
+                error_msg = error_data.get('message', str(response.status_code))
+            except:
+                error_msg = f"Status {response.status_code}"
+            self.logger.error("Failed to sync attendance: %s", error_msg)
+            if response.status_code != 429 and response.status_code < 500:
                 return False
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"Error syncing attendance: {e}")
-            return False
 
-    def send_batch_attendance(self, records: List[Dict]) -> Dict:
+        return False
+
+    def _encode_batch(self, records: List[Dict]) -> Tuple[bytes, Optional[Dict]]:
+        """Serialize (and optionally compress) a batch into a request body and extra headers"""
+        body = fastjson.dumps({'records': records})
+        headers = None
+        if self.compress_batches and len(body) > COMPRESS_MIN_BYTES:
+            # Level 1: nearly all of the size win on repetitive JSON for little CPU
+            body = gzip.compress(body, compresslevel=1)
+            headers = {'Content-Encoding': 'gzip'}
+        return body, headers
+
+    def send_batch_attendance(self, records: List[Dict], payload: Optional[Tuple[bytes, Optional[Dict]]] = None) -> Dict:
         """
         Send multiple attendance records to backend.
         Uses the /attendance/batch endpoint for efficient bulk sync.
+
+        Args:
+            records: Records in the batch
+            payload: Pre-encoded (body, headers) from _encode_batch, reused across retries
         """
         if not records:
             return {'success': 0, 'failed': 0, 'synced_ids': [], 'errors': []}
 
+        body, headers = payload or self._encode_batch(records)
+
         try:
-            response = requests.post(
-                f"{self.api_url}/attendance/batch",
-                json={'records': records},
-                headers=self._get_headers(),
+            response = self._request(
+                'POST', self._url_batch,
+                data=body,
+                headers=headers,
                 timeout=self.timeout * 2  # Longer timeout for batch
             )
 
             if response.status_code in [200, 201]:
-                result = response.json()
+                result = fastjson.loads(response.content)
                 # Extract synced timestamps from results
                 synced_ids = []
                 errors = []
@@ -183,8 +422,8 @@ class APISync:
                 successful = result.get('results', {}).get('successful', len(records))
                 failed = result.get('results', {}).get('failed', 0)
 
-                self.logger.info(f"Batch sync: {successful} successful, {failed} failed")
-                self.last_sync = datetime.utcnow()
+                self.logger.info("Batch sync: %s successful, %s failed", successful, failed)
+                self.last_sync = datetime.now(timezone.utc)
 
                 return {
                     'success': successful,
@@ -195,50 +434,140 @@ class APISync:
             else:
                 error_msg = f"Status {response.status_code}"
                 try:
-                    error_data = response.json()
+                    error_data = fastjson.loads(response.content)
                     error_msg = error_data.get('message', error_msg)
                 except:
                     pass
-                self.logger.error(f"Batch sync failed: {error_msg}")
-                return {'success': 0, 'failed': len(records), 'synced_ids': [], 'errors': []}
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"Error in batch sync: {e}")
+                self.logger.error("Batch sync failed: %s", error_msg)
+                return {
+                    'success': 0,
+                    'failed': len(records),
+                    'synced_ids': [],
+                    'errors': [],
+                    'retryable': response.status_code == 429 or response.status_code >= 500,
+                    'retry_after': self._parse_retry_after(response.headers.get('Retry-After'))
+                }
+        except ValueError as e:
+            # 2xx with an unparseable body; resending would not help
+            self.logger.error("Invalid batch sync response: %s", e)
             return {'success': 0, 'failed': len(records), 'synced_ids': [], 'errors': []}
+        except CircuitOpenError as e:
+            # Retrying before the breaker resets would only sleep
+            self.logger.warning("Batch sync skipped: %s", e)
+            return {'success': 0, 'failed': len(records), 'synced_ids': [], 'errors': [], 'retryable': False}
+        except requests.exceptions.RequestException as e:
+            self._invalidate_online_cache()
+            self.logger.error("Error in batch sync: %s", e)
+            return {'success': 0, 'failed': len(records), 'synced_ids': [], 'errors': [], 'retryable': True}
+
+    @staticmethod
+    def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """Parse a Retry-After header given in seconds or as an HTTP date"""
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_at = parsedate_to_datetime(value)
+            return max(0.0, retry_at.timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
 
-    def sync_records_in_chunks(self, records: List[Dict], chunk_size: Optional[int] = None) -> Dict:
+    @staticmethod
+    def _backoff(attempt: int, base: float = 1.0, cap: float = 60.0) -> float:
+        """
+        Exponential backoff with jitter: the delay for an attempt is spread
+        uniformly over 0.5x-1.5x so a fleet of devices does not retry in lockstep.
         """
-        Sync records in chunks to avoid overwhelming the API.
+        return min(base * (2 ** attempt), cap) * (0.5 + random.random())
+
+    def _send_chunk(self, chunk: List[Dict]) -> Dict:
+        """Send one chunk, backing off and retrying while the backend is overloaded"""
+        # Encode once; retries resend the same buffer
+        payload = self._encode_batch(chunk)
+        for attempt in range(self.max_retries + 1):
+            result = self.send_batch_attendance(chunk, payload)
+            if not result.get('retryable') or attempt == self.max_retries:
+                break
+
+            delay = self._backoff(attempt)
+            if result.get('retry_after') is not None:
+                # Honor the server's hint, capped like our own backoff
+                delay = min(result['retry_after'], 60)
+            self.logger.warning("Retrying chunk of %d records in %.1fs (attempt %d/%d)",
+                                len(chunk), delay, attempt + 1, self.max_retries)
+            time.sleep(delay)
+
+        self._track_retries(chunk, result, attempt + 1)
+        return result
+
+    def _track_retries(self, chunk: List[Dict], result: Dict, attempts: int):
+        """Update per-record retry counts after a chunk has been sent"""
+        with self._retry_lock:
+            for timestamp in result['synced_ids']:
+                self.retry_counts.pop(timestamp, None)
+            if not result.get('retryable'):
+                return
+
+            for record in chunk:
+                timestamp = record['timestamp']
+                count = self.retry_counts.get(timestamp, 0) + attempts
+                self.retry_counts[timestamp] = count
+                if count - attempts < self.max_retries <= count:
+                    self.failed_records.append(record)
+                    self.logger.warning("Record %s @ %s failed %d attempts, kept in offline storage",
+                                        record['card_id'], timestamp, count)
+
+    def sync_records_in_chunks(self, records: List[Dict], chunk_size: Optional[int] = None,
+                               max_workers: Optional[int] = None) -> Dict:
+        """
+        Sync records in chunks, posting up to max_workers chunks concurrently
+        (default: sync.max_concurrency). The batch endpoint is stateless, so
+        chunks are independent.
         Returns aggregate results from all chunks.
         """
         if not records:
             return {'success': 0, 'failed': 0, 'synced_ids': [], 'errors': []}
 
         chunk_size = chunk_size or self.batch_size
+        num_chunks = (len(records) + chunk_size - 1) // chunk_size
+        self.logger.info("Syncing %d records in %d chunks", len(records), num_chunks)
+
+        chunks = (records[i:i + chunk_size] for i in range(0, len(records), chunk_size))
+        return self.sync_from_iterator(chunks, max_workers)
+
+    def sync_from_iterator(self, batches: Iterable[List[Dict]], max_workers: Optional[int] = None) -> Dict:
+        """
+        Send batches as they are produced, e.g. from
+        OfflineStorage.iter_unsynced_records(). At most max_workers batches
+        are in flight, so only that many are held in memory at once.
+        Returns aggregate results from all batches.
+        """
+        max_workers = max_workers or self.max_concurrency
         total_success = 0
         total_failed = 0
         all_synced_ids = []
         all_errors = []
 
-        # Process records in chunks
-        for i in range(0, len(records), chunk_size):
-            chunk = records[i:i + chunk_size]
-            chunk_num = (i // chunk_size) + 1
-            total_chunks = (len(records) + chunk_size - 1) // chunk_size
-
-            self.logger.info(f"Processing chunk {chunk_num}/{total_chunks} ({len(chunk)} records)")
-
-            result = self.send_batch_attendance(chunk)
-
+        def collect(result):
+            nonlocal total_success, total_failed
             total_success += result['success']
             total_failed += result['failed']
             all_synced_ids.extend(result['synced_ids'])
             all_errors.extend(result.get('errors', []))
 
-            # Small delay between chunks to avoid overwhelming the API
-            if i + chunk_size < len(records):
-                time.sleep(0.5)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            in_flight = deque()
+            for batch in batches:
+                in_flight.append(executor.submit(self._send_chunk, batch))
+                if len(in_flight) >= max_workers:
+                    collect(in_flight.popleft().result())
+            while in_flight:
+                collect(in_flight.popleft().result())
 
-        self.logger.info(f"Chunk sync complete: {total_success} successful, {total_failed} failed")
+        self.logger.info("Chunk sync complete: %s successful, %s failed", total_success, total_failed)
 
         return {
             'success': total_success,
@@ -256,7 +585,8 @@ class APISync:
             'min_records_for_sync': self.min_records_for_sync,
             'immediate_sync': self.immediate_sync,
             'last_sync': self.last_sync.isoformat() if self.last_sync else None,
-            'is_online': self.is_online
+            'is_online': self.is_online,
+            'circuit_state': self._breaker.state
         }
 
     def register_device(self) -> bool:
@@ -265,88 +595,88 @@ class APISync:
         Uses the /device-api/register endpoint with API key auth.
         """
         device_info = {
-            'device_id': self.config['device']['id'],
-            'device_name': self.config['device']['name'],
-            'location': self.config['device']['location'],
+            'device_id': self._device_id,
+            'device_name': self._device_name,
+            'location': self._device_location,
             'metadata': {
-                'registered_at': datetime.utcnow().isoformat(),
+                'registered_at': self._started_at,
                 'software_version': '1.0.0',
                 'device_type': 'ATLAS_EDGE'
             }
         }
 
         try:
-            response = requests.post(
-                f"{self.api_url}/device-api/register",
-                json=device_info,
-                headers=self._get_headers(),
+            response = self._request(
+                'POST', self._url_register,
+                data=fastjson.dumps(device_info),
                 timeout=self.timeout
             )
 
             if response.status_code in [200, 201]:
-                result = response.json()
-                self.logger.info(f"Device registered successfully: {result.get('device', {}).get('name', 'unknown')}")
+                result = fastjson.loads(response.content)
+                self.logger.info("Device registered successfully: %s", result.get('device', {}).get('name', 'unknown'))
                 return True
             else:
                 error_msg = f"Status {response.status_code}"
                 try:
-                    error_data = response.json()
+                    error_data = fastjson.loads(response.content)
                     error_msg = error_data.get('message', error_msg)
                 except:
                     pass
-                self.logger.error(f"Device registration failed: {error_msg}")
+                self.logger.error("Device registration failed: %s", error_msg)
                 return False
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"Error registering device: {e}")
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self.logger.error("Error registering device: %s", e)
             return False
 
     def get_device_info(self) -> Optional[Dict]:
         """Get device information from backend"""
         try:
-            response = requests.get(
-                f"{self.api_url}/device-api/info",
-                headers=self._get_headers(),
+            response = self._request(
+                'GET', self._url_info,
                 timeout=self.timeout
             )
 
             if response.status_code == 200:
-                return response.json()
+                return fastjson.loads(response.content)
             else:
-                self.logger.error(f"Failed to get device info. Status: {response.status_code}")
+                self.logger.error("Failed to get device info. Status: %s", response.status_code)
                 return None
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"Error getting device info: {e}")
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self.logger.error("Error getting device info: %s", e)
             return None
 
     def heartbeat(self) -> bool:
         """
         Send heartbeat to backend to indicate device is online.
-        Uses the /device-api/heartbeat endpoint.
+        Uses the /device-api/heartbeat endpoint. A successful heartbeat also
+        refreshes the cached online state, standing in for a health probe.
         """
         heartbeat_data = {
             'status': 'online',
             'metadata': {
-                'timestamp': datetime.utcnow().isoformat(),
+                'timestamp': datetime.now(timezone.utc).isoformat(),
                 'uptime': self._get_uptime()
             }
         }
 
         try:
-            response = requests.post(
-                f"{self.api_url}/device-api/heartbeat",
-                json=heartbeat_data,
-                headers=self._get_headers(),
+            response = self._request(
+                'POST', self._url_heartbeat,
+                data=fastjson.dumps(heartbeat_data),
                 timeout=self.timeout
             )
 
             if response.status_code == 200:
                 self.logger.debug("Heartbeat sent successfully")
+                self._mark_online()
                 return True
             else:
-                self.logger.warning(f"Heartbeat failed. Status: {response.status_code}")
+                self.logger.warning("Heartbeat failed. Status: %s", response.status_code)
                 return False
         except requests.exceptions.RequestException as e:
-            self.logger.warning(f"Heartbeat error: {e}")
+            self._invalidate_online_cache()
+            self.logger.warning("Heartbeat error: %s", e)
             return False
 
     def _get_uptime(self) -> str:
@@ -398,7 +728,7 @@ if __name__ == "__main__":
         print("\n--- Testing Single Attendance ---")
         test_record = {
             'card_id': 'TEST-123456789',
-            'timestamp': datetime.utcnow().isoformat() + 'Z',
+            'timestamp': datetime.now(timezone.utc).isoformat(),
             'device_id': api.config['device']['id'],
             'location': api.config['device']['location']
         }
@@ -409,10 +739,11 @@ if __name__ == "__main__":
             print("✗ Test attendance failed (card may not exist)")
 
         print("\n--- Testing Batch Attendance ---")
+        now = datetime.now(timezone.utc).isoformat()
         test_records = [
             {
                 'card_id': f'TEST-BATCH-{i}',
-                'timestamp': datetime.utcnow().isoformat() + 'Z',
+                'timestamp': now,
                 'device_id': api.config['device']['id'],
                 'location': api.config['device']['location']
             }
@@ -0,0 +1,51 @@
+"""
+Configuration loading for Atlas Edge
+Each config file is parsed once and shared by every service; it is
+re-read only when its modification time changes
+"""
+
+import os
+
+try:
+    from services import fastjson
+except ImportError:  # Run directly as a script
+    import fastjson
+
+DEFAULT_CONFIG_PATH = 'config/config.json'
+
+# abspath -> (st_mtime_ns, parsed config)
+_CONFIG_CACHE = {}
+
+
+def load_config(path=DEFAULT_CONFIG_PATH):
+    """
+    Load configuration from a JSON file.
+
+    The parsed config is cached by (path, mtime), so repeated loads of an
+    unchanged file skip disk reads and parsing. If the file becomes
+    unreadable or invalid, the last good copy is returned instead.
+
+    The returned dict is shared between all callers and must be treated
+    as read-only.
+    """
+    path = os.path.abspath(path)
+    cached = _CONFIG_CACHE.get(path)
+
+    try:
+        mtime = os.stat(path).st_mtime_ns
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        with open(path, 'rb') as f:
+            config = fastjson.loads(f.read())
+    except (OSError, ValueError):
+        if cached is not None:
+            return cached[1]
+        raise
+
+    _CONFIG_CACHE[path] = (mtime, config)
+    return config
+
+
+def clear_config_cache():
+    """Drop cached configs so the next load_config() re-reads the file"""
+    _CONFIG_CACHE.clear()
@@ -0,0 +1,48 @@
+"""
+JSON helpers for Atlas Edge
+Uses orjson when it is installed and falls back to the standard library
+"""
+
+import json
+
+# orjson is optional: several times faster for the record payloads we encode
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def loads(data):
+    """Parse JSON from str or bytes"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj, indent=False) -> bytes:
+    """Serialize obj to UTF-8 JSON bytes, compact unless indent is set"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    if indent:
+        return json.dumps(obj, indent=2).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def dumps_text(obj, default=None, sort_keys=False, indent=False) -> str:
+    """
+    Serialize obj to a JSON str following the stdlib encoder's rules:
+    non-string keys are converted, and types JSON has no form for
+    (including dates and dataclasses when a default hook is given) are
+    passed to default.
+    """
+    if ORJSON_AVAILABLE:
+        option = orjson.OPT_NON_STR_KEYS
+        if default is not None:
+            option |= orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=default, option=option).decode('utf-8')
+    return json.dumps(obj, default=default, sort_keys=sort_keys, indent=2 if indent else None)
@@ -0,0 +1,34 @@
+"""
+Flask JSON provider for the Atlas Edge web apps
+Encodes responses through services.fastjson (orjson when installed) while
+keeping Flask's output rules: sorted keys and its default hook for dates,
+dataclasses, UUIDs and the like
+"""
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    from services import fastjson
+except ImportError:  # Run directly as a script
+    import fastjson
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider with encoding and decoding done by fastjson"""
+
+    def dumps(self, obj, **kwargs):
+        return fastjson.dumps_text(
+            obj,
+            default=kwargs.get('default', self.default),
+            sort_keys=kwargs.get('sort_keys', self.sort_keys),
+            indent=bool(kwargs.get('indent'))
+        )
+
+    def loads(self, s, **kwargs):
+        return fastjson.loads(s)
+
+
+def install(app):
+    """Use FastJSONProvider for app when orjson is available; Flask's own encoder otherwise"""
+    if fastjson.ORJSON_AVAILABLE:
+        app.json = FastJSONProvider(app)
@@ -0,0 +1,42 @@
+"""
+Logging setup shared by Atlas Edge services
+Console output is configured once on the root logger; each component
+writes its own log file under logs/ through its named logger
+"""
+
+import logging
+from pathlib import Path
+
+LOG_DIR = Path('logs')
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+def _configure_root():
+    """Attach the console handler to the root logger, once per process"""
+    root = logging.getLogger()
+    if root.handlers:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+
+def get_logger(name, log_file=None):
+    """
+    Get a component logger.
+
+    Args:
+        name: Logger name shown in each line
+        log_file: Optional file name under logs/ for this component only;
+                  the handler is added the first time the logger is requested
+    """
+    _configure_root()
+    logger = logging.getLogger(name)
+    if log_file and not logger.handlers:
+        LOG_DIR.mkdir(exist_ok=True)
+        # delay: the file is opened on the first record, not at construction
+        handler = logging.FileHandler(LOG_DIR / log_file, delay=True)
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        logger.addHandler(handler)
+    return logger
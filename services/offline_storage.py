@@ -1,147 +1,499 @@
 """
 Offline Storage Manager for Atlas Edge
 Handles local storage when server is unreachable
+
+Records live in a SQLite database next to the configured offline log
+(offline_attendance.json -> offline_attendance.db). A legacy JSON log found
+at the configured path is imported once on first start.
 """
 
 import json
-import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from datetime import datetime
-from typing import List, Dict
-import fcntl
+from datetime import datetime, timezone
+from typing import List, Dict, Iterator, Optional, Tuple
+
+try:
+    from services import fastjson
+    from services.config import load_config
+    from services.logging_setup import get_logger
+except ImportError:  # Run directly as a script
+    import fastjson
+    from config import load_config
+    from logging_setup import get_logger
+
+JOURNAL_MODES = ('delete', 'truncate', 'persist', 'memory', 'wal', 'off')
+
+# Timestamps per UPDATE ... IN (...) statement, below SQLite's bound-variable limit
+MARK_BATCH_SIZE = 500
+
+# Connection tuning applied on every open; override via storage.pragmas.
+# Negative cache_size is in KiB (64 MB).
+DEFAULT_PRAGMAS = {
+    'cache_size': -65536,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+    'page_size': 4096
+}
 
 class OfflineStorage:
-    def __init__(self, config_path='config/config.json'):
-        self.config = self._load_config(config_path)
-        self.storage_file = Path(self.config['storage']['offline_log'])
-        self.max_records = self.config['storage']['max_offline_records']
+    def __init__(self, config_path='config/config.json', config=None):
+        self.config = config if config is not None else self._load_config(config_path)
+        storage_config = self.config['storage']
+        self.legacy_file = Path(storage_config['offline_log'])
+        self.storage_file = self.legacy_file.with_suffix('.db')
+        self.max_records = storage_config['max_offline_records']
+        self.journal_mode = storage_config.get('journal_mode', 'wal').lower()
+        self.pragmas = {**DEFAULT_PRAGMAS, **storage_config.get('pragmas', {})}
+        self._lock = threading.RLock()
+        # Rows in the table as last counted plus this process's inserts and
+        # deletes since; None until first needed
+        self._row_count = None
+        # Thread that holds a transaction opened by begin(), if any
+        self._explicit_owner = None
         self.setup_logging()
-        self._ensure_storage_file()
-    
+        self._connect()
+        self._ensure_schema()
+        self._import_legacy_records()
+
     def _load_config(self, config_path):
         """Load configuration from JSON file"""
-        with open(config_path, 'r') as f:
-            return json.load(f)
-    
+        return load_config(config_path)
+
     def setup_logging(self):
         """Setup logging configuration"""
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('logs/storage.log'),
-                logging.StreamHandler()
-            ]
-        )
-        self.logger = logging.getLogger('OfflineStorage')
-    
-    def _ensure_storage_file(self):
-        """Ensure storage file exists"""
+        self.logger = get_logger('OfflineStorage', 'storage.log')
+
+    def _connect(self):
+        """Open the database and apply per-connection pragmas"""
+        if self.journal_mode not in JOURNAL_MODES:
+            self.logger.warning(f"Unknown journal mode '{self.journal_mode}', falling back to wal")
+            self.journal_mode = 'wal'
+
         self.storage_file.parent.mkdir(parents=True, exist_ok=True)
-        if not self.storage_file.exists():
-            self._write_records([])
-    
-    def _read_records(self) -> List[Dict]:
-        """Read all records from storage file with file locking"""
+        is_new = not self.storage_file.exists()
+        # Autocommit mode: transactions are opened explicitly in _transaction()
+        self._conn = sqlite3.connect(
+            str(self.storage_file),
+            timeout=10,
+            isolation_level=None,
+            check_same_thread=False
+        )
+
+        # page_size only takes effect before the first table is created
+        # (and cannot change once in WAL mode), so apply it to fresh files only
+        for name, value in self.pragmas.items():
+            if name == 'page_size' and not is_new:
+                continue
+            try:
+                self._conn.execute(f"PRAGMA {name}={value}")
+            except sqlite3.Error as e:
+                self.logger.warning(f"Could not apply PRAGMA {name}={value}: {e}")
+
+        self.journal_mode = self._conn.execute(f"PRAGMA journal_mode={self.journal_mode}").fetchone()[0]
+        if self.journal_mode == 'wal':
+            # NORMAL is durable across application crashes in WAL mode and
+            # drops the per-commit fsync of the WAL file
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA wal_autocheckpoint=1000")
+
+    def _ensure_schema(self):
+        """Create the attendance table if it does not exist"""
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS attendance (
+                id INTEGER PRIMARY KEY,
+                card_id TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                synced INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        # Partial index covering only unsynced rows; it shrinks as records
+        # are synced and cleared, so pending-record lookups stay cheap
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_unsynced ON attendance(timestamp) WHERE synced = 0"
+        )
+        # Time-window counts (portal stats) read only the matching range
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_timestamp ON attendance(timestamp)"
+        )
+        # Synced/unsynced listings walk this in timestamp order, no sort step
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_synced_timestamp ON attendance(synced, timestamp)"
+        )
+
+    def _import_legacy_records(self):
+        """Import records from the old JSON storage file, if present"""
+        if self.legacy_file == self.storage_file or not self.legacy_file.exists():
+            return
+
+        # The attendance service and the web portal both start up here; the
+        # write lock lets only one of them import and rename the file
+        records = []
         try:
-            with open(self.storage_file, 'r') as f:
-                fcntl.flock(f.fileno(), fcntl.LOCK_SH)
-                data = json.load(f)
-                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-                return data
-        except json.JSONDecodeError:
-            self.logger.warning("Corrupted storage file, creating new one")
-            return []
-        except Exception as e:
+            with self._transaction() as conn:
+                if not self.legacy_file.exists():
+                    return
+
+                try:
+                    with open(self.legacy_file, 'rb') as f:
+                        records = fastjson.loads(f.read())
+                except FileNotFoundError:
+                    raise
+                except (OSError, ValueError) as e:
+                    self.logger.warning(f"Could not read legacy storage file {self.legacy_file}: {e}")
+                    records = []
+
+                if records:
+                    self._insert(conn, records)
+                self.legacy_file.rename(self.legacy_file.with_name(self.legacy_file.name + '.migrated'))
+        except FileNotFoundError:
+            self.logger.info(f"Legacy storage file {self.legacy_file} was already migrated by another process")
+            return
+
+        if records:
+            self.logger.info(f"Imported {len(records)} records from {self.legacy_file}")
+
+    @contextmanager
+    def _transaction(self):
+        """
+        Run the enclosed statements in a single write transaction.
+        Nested use joins the outer transaction instead of committing early.
+        """
+        with self._lock:
+            if self._conn.in_transaction:
+                yield self._conn
+                return
+
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.rollback()
+                self._row_count = None  # may include rolled-back changes
+                raise
+            self._conn.commit()
+
+    def begin(self):
+        """
+        Open an explicit write transaction spanning several storage calls.
+        Must be paired with commit() or rollback() from the same thread.
+        """
+        self._lock.acquire()
+        try:
+            self._conn.execute("BEGIN IMMEDIATE")
+        except Exception:
+            self._lock.release()
+            raise
+        self._explicit_owner = threading.get_ident()
+
+    def _in_explicit_transaction(self) -> bool:
+        """
+        True while the calling thread is inside begin() ... commit().
+        Write errors are then re-raised, so the caller rolls the whole
+        transaction back instead of committing a partial one.
+        """
+        return self._explicit_owner == threading.get_ident()
+
+    def commit(self):
+        """
+        Commit the transaction opened by begin(). If the commit fails the
+        transaction stays open; call rollback() to end it.
+        """
+        self._conn.commit()
+        self._explicit_owner = None
+        self._lock.release()
+
+    def rollback(self):
+        """Roll back the transaction opened by begin()"""
+        self._explicit_owner = None
+        self._row_count = None  # may include rolled-back changes
+        try:
+            self._conn.rollback()
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def _to_row(record: Dict) -> tuple:
+        """Split a record into (card_id, timestamp, payload, synced) columns"""
+        payload = {k: v for k, v in record.items() if k != 'synced'}
+        return (
+            str(record.get('card_id', '')),
+            record.get('timestamp', ''),
+            # Stored as encoded bytes; rows written as text by older versions still load
+            fastjson.dumps(payload),
+            1 if record.get('synced', False) else 0
+        )
+
+    @staticmethod
+    def _from_row(row) -> Dict:
+        """Rebuild a record dict from a (payload, synced) row"""
+        record = fastjson.loads(row[0])
+        record['synced'] = bool(row[1])
+        return record
+
+    def _insert(self, conn, records: List[Dict]):
+        """Insert records and trim the table to max_records"""
+        if self._row_count is None:
+            self._row_count = conn.execute("SELECT COUNT(*) FROM attendance").fetchone()[0]
+
+        conn.executemany(
+            "INSERT INTO attendance (card_id, timestamp, payload, synced) VALUES (?, ?, ?, ?)",
+            [self._to_row(r) for r in records]
+        )
+        self._row_count += len(records)
+
+        # The running count skips a full COUNT(*) on every flush. Deletes made
+        # by other processes (the portal clearing synced records) leave it
+        # high, so recount before trimming
+        if self._row_count > self.max_records:
+            total = conn.execute("SELECT COUNT(*) FROM attendance").fetchone()[0]
+            if total > self.max_records:
+                self.logger.warning(f"Max records exceeded, removing oldest entries")
+                conn.execute(
+                    "DELETE FROM attendance WHERE id IN (SELECT id FROM attendance ORDER BY id LIMIT ?)",
+                    (total - self.max_records,)
+                )
+                total = self.max_records
+            self._row_count = total
+
+    def _read_records(self, where: str = '', params: tuple = (), limit: Optional[int] = None) -> List[Dict]:
+        """Read records in insertion order, optionally only the first `limit`"""
+        if limit is not None:
+            where += " ORDER BY id LIMIT ?"
+            params += (limit,)
+        else:
+            where += " ORDER BY id"
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT payload, synced FROM attendance {where}", params
+                ).fetchall()
+            return [self._from_row(row) for row in rows]
+        except sqlite3.Error as e:
             self.logger.error(f"Error reading storage: {e}")
             return []
-    
-    def _write_records(self, records: List[Dict]):
-        """Write records to storage file with file locking"""
-        try:
-            with open(self.storage_file, 'w') as f:
-                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
-                json.dump(records, f, indent=2)
-                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-        except Exception as e:
-            self.logger.error(f"Error writing storage: {e}")
-    
+
     def add_record(self, record: Dict):
         """Add a new attendance record to offline storage"""
-        records = self._read_records()
-        
+        self.add_records_bulk([record])
+
+    def add_records_bulk(self, records: List[Dict]):
+        """Add several attendance records in a single transaction"""
+        if not records:
+            return
+
         # Add synced flag if not present
-        if 'synced' not in record:
-            record['synced'] = False
-        
-        records.append(record)
-        
-        # Trim if exceeds max records
-        if len(records) > self.max_records:
-            self.logger.warning(f"Max records exceeded, removing oldest entries")
-            records = records[-self.max_records:]
-        
-        self._write_records(records)
-        self.logger.info(f"Record added to offline storage. Total records: {len(records)}")
-    
-    def get_unsynced_records(self) -> List[Dict]:
-        """Get all records that haven't been synced to server"""
-        records = self._read_records()
-        unsynced = [r for r in records if not r.get('synced', False)]
+        for record in records:
+            if 'synced' not in record:
+                record['synced'] = False
+
+        try:
+            with self._transaction() as conn:
+                self._insert(conn, records)
+        except sqlite3.Error as e:
+            self.logger.error(f"Error writing storage: {e}")
+            return
+
+        self.logger.info(f"Added {len(records)} record(s) to offline storage")
+
+    def get_unsynced_records(self, limit: Optional[int] = None) -> List[Dict]:
+        """Get records that haven't been synced to server (oldest first, up to limit)"""
+        unsynced = self._read_records("WHERE synced = 0", limit=limit)
         self.logger.info(f"Found {len(unsynced)} unsynced records")
         return unsynced
-    
+
+    def iter_unsynced_records(self, batch_size: int = 500) -> Iterator[List[Dict]]:
+        """
+        Yield unsynced records oldest first, batch_size at a time.
+        Pages are fetched by id (keyset) so only one page is held in memory.
+        """
+        last_id = 0
+        while True:
+            try:
+                with self._lock:
+                    rows = self._conn.execute(
+                        "SELECT id, payload, synced FROM attendance WHERE synced = 0 AND id > ? ORDER BY id LIMIT ?",
+                        (last_id, batch_size)
+                    ).fetchall()
+            except sqlite3.Error as e:
+                self.logger.error(f"Error reading storage: {e}")
+                return
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield [self._from_row(row[1:]) for row in rows]
+
     def mark_as_synced(self, record_ids: List[str]):
         """Mark records as synced by their timestamps"""
-        records = self._read_records()
-        synced_count = 0
-        
-        for record in records:
-            if record.get('timestamp') in record_ids:
-                record['synced'] = True
-                synced_count += 1
-        
-        self._write_records(records)
+        try:
+            synced_count = 0
+            with self._transaction() as conn:
+                # One IN-list statement per batch instead of one UPDATE per record
+                for i in range(0, len(record_ids), MARK_BATCH_SIZE):
+                    batch = record_ids[i:i + MARK_BATCH_SIZE]
+                    placeholders = ','.join('?' * len(batch))
+                    synced_count += conn.execute(
+                        f"UPDATE attendance SET synced = 1 WHERE synced = 0 AND timestamp IN ({placeholders})",
+                        batch
+                    ).rowcount
+        except sqlite3.Error as e:
+            self.logger.error(f"Error writing storage: {e}")
+            if self._in_explicit_transaction():
+                raise
+            return
+
+        # Refresh planner statistics only where they have drifted
+        try:
+            with self._lock:
+                self._conn.execute("PRAGMA optimize")
+        except sqlite3.Error as e:
+            self.logger.warning(f"PRAGMA optimize failed: {e}")
+
         self.logger.info(f"Marked {synced_count} records as synced")
-    
+
+    def count_unsynced(self) -> int:
+        """Count unsynced records (answered from the partial index)"""
+        try:
+            with self._lock:
+                return self._conn.execute(
+                    "SELECT COUNT(*) FROM attendance WHERE synced = 0"
+                ).fetchone()[0]
+        except sqlite3.Error as e:
+            self.logger.error(f"Error reading storage: {e}")
+            return 0
+
     def get_all_records(self) -> List[Dict]:
         """Get all records"""
         return self._read_records()
-    
+
+    def query(self, synced: Optional[bool] = None, search: str = '', limit: Optional[int] = None,
+              offset: int = 0, newest_first: bool = True) -> Tuple[List[Dict], int]:
+        """
+        Filter, sort and page records in SQL.
+
+        Args:
+            synced: Only synced (True) or unsynced (False) records; None for all
+            search: Case-insensitive substring of card_id
+            limit: Page size; None for all matches
+            offset: Matches to skip before the page
+            newest_first: Sort by timestamp descending (ties follow the same direction)
+
+        Returns:
+            (records, total): the requested page and the number of matches overall
+        """
+        clauses = []
+        params = []
+        if synced is not None:
+            clauses.append("synced = ?")
+            params.append(1 if synced else 0)
+        if search:
+            clauses.append("instr(lower(card_id), ?) > 0")
+            params.append(search.lower())
+        where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+
+        # Ties broken by id in the same direction, so the index order is the
+        # result order and SQLite never sorts
+        direction = 'DESC' if newest_first else 'ASC'
+        sql = f"SELECT payload, synced FROM attendance {where} ORDER BY timestamp {direction}, id {direction}"
+        page_params = list(params)
+        if limit is not None or offset:
+            sql += " LIMIT ? OFFSET ?"
+            page_params += [limit if limit is not None else -1, offset]
+
+        try:
+            with self._lock:
+                total = self._conn.execute(
+                    f"SELECT COUNT(*) FROM attendance {where}", params
+                ).fetchone()[0]
+                rows = self._conn.execute(sql, page_params).fetchall()
+        except sqlite3.Error as e:
+            self.logger.error(f"Error reading storage: {e}")
+            return [], 0
+        return [self._from_row(row) for row in rows], total
+
+    def count_by_hour(self, start: str, end: str) -> Dict[str, int]:
+        """
+        Count records with start <= timestamp < end, per hour of day.
+        Bounds are ISO strings compared as text, e.g. '2024-01-15' and
+        '2024-01-16' for one day; keys are 'HH'.
+        """
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT substr(timestamp, 12, 2), COUNT(*) FROM attendance "
+                    "WHERE timestamp >= ? AND timestamp < ? GROUP BY 1",
+                    (start, end)
+                ).fetchall()
+        except sqlite3.Error as e:
+            self.logger.error(f"Error reading storage: {e}")
+            return {}
+        return dict(rows)
+
+    def count_since(self, start: str) -> int:
+        """Count records with timestamp >= start (ISO string compared as text)"""
+        try:
+            with self._lock:
+                # The GLOB keeps malformed timestamps (which sort after digits) out
+                return self._conn.execute(
+                    "SELECT COUNT(*) FROM attendance WHERE timestamp >= ? "
+                    "AND timestamp GLOB '[0-9][0-9][0-9][0-9]-*'",
+                    (start,)
+                ).fetchone()[0]
+        except sqlite3.Error as e:
+            self.logger.error(f"Error reading storage: {e}")
+            return 0
+
     def get_stats(self) -> Dict:
         """Get storage statistics"""
-        records = self._read_records()
-        synced = sum(1 for r in records if r.get('synced', False))
-        unsynced = len(records) - synced
-        
+        try:
+            with self._lock:
+                total, synced = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(synced), 0) FROM attendance"
+                ).fetchone()
+        except sqlite3.Error as e:
+            self.logger.error(f"Error reading storage: {e}")
+            total, synced = 0, 0
+
         return {
-            'total_records': len(records),
+            'total_records': total,
             'synced_records': synced,
-            'unsynced_records': unsynced,
+            'unsynced_records': total - synced,
             'storage_file': str(self.storage_file),
+            'journal_mode': self.journal_mode,
             'max_capacity': self.max_records
         }
-    
+
     def clear_synced_records(self):
         """Remove all synced records to free up space"""
-        records = self._read_records()
-        unsynced = [r for r in records if not r.get('synced', False)]
-        self._write_records(unsynced)
-        removed = len(records) - len(unsynced)
+        try:
+            with self._transaction() as conn:
+                removed = conn.execute("DELETE FROM attendance WHERE synced = 1").rowcount
+        except sqlite3.Error as e:
+            self.logger.error(f"Error writing storage: {e}")
+            if self._in_explicit_transaction():
+                raise
+            return 0
+
+        if self._row_count is not None:
+            self._row_count -= removed
+
         self.logger.info(f"Cleared {removed} synced records")
         return removed
 
 if __name__ == "__main__":
     # Test the storage
     storage = OfflineStorage()
-    
+
     # Add test record
     test_record = {
         'card_id': '123456789',
-        'timestamp': datetime.utcnow().isoformat(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
         'device_id': 'test-device',
         'synced': False
     }
-    
+
     storage.add_record(test_record)
     print(f"Stats: {json.dumps(storage.get_stats(), indent=2)}")
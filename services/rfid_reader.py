@@ -6,22 +6,156 @@ USB IC Readers act as HID keyboard devices - this module grabs exclusive access
 to prevent keystrokes from being sent to other applications
 """
 
+import ctypes
+import errno
+import fcntl
+import glob
 import json
-import time
-import logging
-import sys
 import os
-from datetime import datetime
-from pathlib import Path
+import queue
+import re
+import select
+import struct
+import sys
+import threading
+import time
+from collections import deque
 
 # Try to import evdev for exclusive input grabbing
 try:
     import evdev
-    from evdev import InputDevice, categorize, ecodes
+    from evdev import InputDevice, ecodes
     EVDEV_AVAILABLE = True
 except ImportError:
     EVDEV_AVAILABLE = False
 
+try:
+    from services.config import load_config
+    from services.logging_setup import get_logger
+except ImportError:  # Run directly as a script
+    from config import load_config
+    from logging_setup import get_logger
+
+_BANNER = "=" * 60
+
+# Longest the reader thread and the callback loop wait before re-checking for stop
+READ_POLL_INTERVAL = 0.5
+
+# Seconds between searches for a reader that was unplugged
+RECONNECT_INTERVAL = 5
+
+# poll() results meaning the device is gone rather than readable
+_POLL_FAILED = select.POLLHUP | select.POLLERR | select.POLLNVAL
+
+# Characters an IC reader types; everything else is ignored
+CARD_CHARS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+def _build_key_map():
+    """Build the key code to character mapping, once at import"""
+    return {getattr(ecodes, f'KEY_{char}'): char for char in CARD_CHARS}
+
+
+def _build_key_table(key_map):
+    """Flatten the key map into bytes indexed by scancode (ASCII code, 0 = ignored key)"""
+    table = bytearray(ecodes.KEY_MAX + 1)
+    for keycode, char in key_map.items():
+        table[keycode] = ord(char)
+    return bytes(table)
+
+
+# EVIOCSMASK = _IOW('E', 0x93, struct input_mask), where struct input_mask is
+# {__u32 type; __u32 codes_size; __u64 codes_ptr} (16 bytes)
+_EVIOCSMASK = (1 << 30) | (16 << 16) | (ord('E') << 8) | 0x93
+
+
+def _bitmask(bits, size):
+    """Kernel-style bitmap of `size` bits with `bits` set, in a C buffer"""
+    mask = bytearray((size + 7) // 8)
+    for bit in bits:
+        mask[bit // 8] |= 1 << (bit % 8)
+    return ctypes.create_string_buffer(bytes(mask), len(mask))
+
+
+# Device names that look like a card reader, for the device listing hint
+_READER_HINT_RE = re.compile(r'reader|ic', re.IGNORECASE)
+
+# device name (lowercase) -> (/dev/input listing, path) of the last successful search
+_DEVICE_PATH_CACHE = {}
+
+# Seconds a failed search is reused while /dev/input is unchanged
+SEARCH_MISS_TTL = 5
+
+
+def _input_dir_signature():
+    """Cheap fingerprint of /dev/input; changes when devices are plugged or unplugged"""
+    try:
+        return frozenset(os.listdir('/dev/input'))
+    except OSError:
+        return None
+
+
+def _has_key_events(path):
+    """
+    Check sysfs for whether an event device reports any keys, without
+    opening it. Unknown (no sysfs entry) counts as yes.
+    """
+    name = os.path.basename(path)
+    try:
+        with open(f'/sys/class/input/{name}/device/capabilities/key') as f:
+            bitmap = f.read().split()
+    except OSError:
+        return True
+    return any(word != '0' for word in bitmap)
+
+
+def _key_device_paths():
+    """Input device paths that can send key events (a card reader must)"""
+    return [path for path in evdev.list_devices() if _has_key_events(path)]
+
+
+def _enumerate_input_devices():
+    """
+    Open each input device once for listing.
+
+    Yields (path, device, has_keys, error); device is None and error is set
+    when the device could not be read. Each device is closed once the
+    consumer moves on.
+    """
+    for path in evdev.list_devices():
+        try:
+            device = InputDevice(path)
+            has_keys = ecodes.EV_KEY in device.capabilities()
+        except Exception as e:
+            yield path, None, False, e
+            continue
+        try:
+            yield path, device, has_keys, None
+        finally:
+            device.close()
+
+
+# (whole second, formatted 'YYYY-MM-DDTHH:MM:SS') of the last timestamp
+_TS_PREFIX = (None, '')
+
+
+def _utc_timestamp():
+    """
+    Current UTC time as 'YYYY-MM-DDTHH:MM:SS.ffffffZ'.
+    Formats from time.time() without building a datetime; the
+    seconds part is reused while the second has not changed.
+    """
+    global _TS_PREFIX
+    t = time.time()
+    sec = int(t)
+    if _TS_PREFIX[0] != sec:
+        _TS_PREFIX = (sec, time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(sec)))
+    return f"{_TS_PREFIX[1]}.{int((t - sec) * 1_000_000):06d}Z"
+
+
+KEY_MAP = _build_key_map() if EVDEV_AVAILABLE else {}
+KEY_TABLE = _build_key_table(KEY_MAP) if EVDEV_AVAILABLE else b''
+
 
 class USBRFIDReader:
     """
@@ -31,7 +165,14 @@ class USBRFIDReader:
     keystrokes from being sent to other applications on the system.
     """
 
-    def __init__(self, config_path='config/config.json', device_path=None, device_name=None):
+    __slots__ = (
+        'config', 'device_path', 'device_name', 'logger', 'device',
+        'last_card_id', 'last_read_ns', 'debounce_time', '_debounce_ns', 'grabbed',
+        'card_buffer', '_cards', 'KEY_MAP', '_record_template',
+        '_last_miss', '_lost_signature', '_poller', '_records', '_stop_event', '_reader_thread'
+    )
+
+    def __init__(self, config_path='config/config.json', device_path=None, device_name=None, config=None):
         """
         Initialize the IC Reader.
 
@@ -39,65 +180,63 @@ class USBRFIDReader:
             config_path: Path to configuration JSON file
             device_path: Explicit path to input device (e.g., /dev/input/event0)
             device_name: Exact name of the device to find (e.g., 'IC Reader')
+            config: Already-loaded configuration; skips reading config_path
         """
-        self.config = self._load_config(config_path)
+        self.config = config if config is not None else self._load_config(config_path)
         self.device_path = device_path or self.config.get('rfid', {}).get('device_path')
         self.device_name = device_name or self.config.get('rfid', {}).get('device_name', 'IC Reader')
         self.setup_logging()
 
         self.device = None
+        # poll object with the device fd registered, made on first read
+        self._poller = None
         self.last_card_id = None
-        self.last_read_time = 0
+        self.last_read_ns = 0
         self.debounce_time = self.config.get('rfid', {}).get('debounce_time', 2)
+        self._debounce_ns = int(self.debounce_time * 1_000_000_000)
         self.grabbed = False
 
-        # Buffer to accumulate card data across multiple read cycles
-        self.card_buffer = []
-
-        # Build key map only if evdev is available
-        self.KEY_MAP = self._build_key_map() if EVDEV_AVAILABLE else {}
-
-    def _build_key_map(self):
-        """Build the key code to character mapping"""
-        return {
-            evdev.ecodes.KEY_1: '1', evdev.ecodes.KEY_2: '2', evdev.ecodes.KEY_3: '3',
-            evdev.ecodes.KEY_4: '4', evdev.ecodes.KEY_5: '5', evdev.ecodes.KEY_6: '6',
-            evdev.ecodes.KEY_7: '7', evdev.ecodes.KEY_8: '8', evdev.ecodes.KEY_9: '9',
-            evdev.ecodes.KEY_0: '0',
-            evdev.ecodes.KEY_A: 'A', evdev.ecodes.KEY_B: 'B', evdev.ecodes.KEY_C: 'C',
-            evdev.ecodes.KEY_D: 'D', evdev.ecodes.KEY_E: 'E', evdev.ecodes.KEY_F: 'F',
-            evdev.ecodes.KEY_G: 'G', evdev.ecodes.KEY_H: 'H', evdev.ecodes.KEY_I: 'I',
-            evdev.ecodes.KEY_J: 'J', evdev.ecodes.KEY_K: 'K', evdev.ecodes.KEY_L: 'L',
-            evdev.ecodes.KEY_M: 'M', evdev.ecodes.KEY_N: 'N', evdev.ecodes.KEY_O: 'O',
-            evdev.ecodes.KEY_P: 'P', evdev.ecodes.KEY_Q: 'Q', evdev.ecodes.KEY_R: 'R',
-            evdev.ecodes.KEY_S: 'S', evdev.ecodes.KEY_T: 'T', evdev.ecodes.KEY_U: 'U',
-            evdev.ecodes.KEY_V: 'V', evdev.ecodes.KEY_W: 'W', evdev.ecodes.KEY_X: 'X',
-            evdev.ecodes.KEY_Y: 'Y', evdev.ecodes.KEY_Z: 'Z',
+        # Buffer to accumulate card data (ASCII bytes) across multiple read cycles
+        self.card_buffer = bytearray()
+        # Card IDs completed in a read batch but not yet returned
+        self._cards = deque()
+
+        # Shared module-level key map (kept as an attribute for existing callers)
+        self.KEY_MAP = KEY_MAP
+
+        # Device fields are fixed for the reader's lifetime; each record
+        # starts as a copy of this template
+        device_config = self.config['device']
+        self._record_template = {
+            'card_id': '',
+            'timestamp': '',
+            'device_id': device_config['id'],
+            'device_name': device_config['name'],
+            'location': device_config['location'],
+            'synced': False
         }
 
+        # (/dev/input listing, monotonic time) of the last search that found nothing
+        self._last_miss = None
+        # /dev/input listing when the reader was unplugged or last searched for
+        self._lost_signature = None
+
+        # Records handed from the reader thread to the callback loop
+        self._records = queue.SimpleQueue()
+        self._stop_event = threading.Event()
+        self._reader_thread = None
+
     def _load_config(self, config_path):
         """Load configuration from JSON file"""
         try:
-            with open(config_path, 'r') as f:
-                return json.load(f)
+            return load_config(config_path)
         except Exception as e:
             print(f"Error loading config: {e}")
             return {'device': {'id': 'unknown', 'name': 'Unknown', 'location': 'Unknown'}}
 
     def setup_logging(self):
         """Setup logging configuration"""
-        log_dir = Path('logs')
-        log_dir.mkdir(exist_ok=True)
-
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.StreamHandler(),
-                logging.FileHandler(log_dir / 'rfid.log')
-            ]
-        )
-        self.logger = logging.getLogger('ICReader')
+        self.logger = get_logger('ICReader', 'rfid.log')
 
     def find_ic_reader(self):
         """
@@ -114,56 +253,122 @@ class USBRFIDReader:
         if self.device_path and os.path.exists(self.device_path):
             try:
                 device = InputDevice(self.device_path)
-                self.logger.info(f"Using configured device: {device.name} at {self.device_path}")
+                self.logger.info("Using configured device: %s at %s", device.name, self.device_path)
                 return device
             except Exception as e:
-                self.logger.error(f"Failed to open configured device {self.device_path}: {e}")
+                self.logger.error("Failed to open configured device %s: %s", self.device_path, e)
 
-        # Search for IC Reader by exact name
-        self.logger.info(f"Searching for device: '{self.device_name}'...")
-
-        for path in evdev.list_devices():
+        # Reuse the last search result while the set of input devices is unchanged
+        cache_key = self.device_name.lower()
+        signature = _input_dir_signature()
+        cached = _DEVICE_PATH_CACHE.get(cache_key)
+        if signature is not None and cached and cached[0] == signature:
             try:
-                device = InputDevice(path)
-
-                # Exact name match (case-insensitive)
-                if device.name.lower() == self.device_name.lower():
-                    self.logger.info(f"Found IC Reader: {device.name}")
-                    self.logger.info(f"  Path: {device.path}")
-                    self.logger.info(f"  Phys: {device.phys}")
+                device = InputDevice(cached[1])
+                if cache_key in device.name.lower():
+                    self.logger.info("Using previously found device: %s at %s", device.name, device.path)
                     return device
+                device.close()
+            except Exception as e:
+                self.logger.debug("Cached device %s unavailable: %s", cached[1], e)
+            del _DEVICE_PATH_CACHE[cache_key]
+
+        # A search that just failed against the same devices would fail again;
+        # skip the rescan (and its device listing) for a short while
+        miss = self._last_miss
+        if signature is not None and miss and miss[0] == signature and \
+           time.monotonic() - miss[1] < SEARCH_MISS_TTL:
+            self.logger.debug("Skipping device search: no input devices changed since the last miss")
+            return None
 
+        device = self._find_by_id() or self._search_devices()
+        if device:
+            self._last_miss = None
+            if signature is not None:
+                _DEVICE_PATH_CACHE[cache_key] = (signature, device.path)
+        else:
+            self._last_miss = (signature, time.monotonic())
+        return device
+
+    def _find_by_id(self):
+        """
+        Look for the reader among the /dev/input/by-id symlinks.
+
+        udev names these after the USB vendor and product strings
+        (e.g. usb-Vendor_IC_Reader-event-kbd), so a likely candidate is
+        found from one directory listing. A candidate is only accepted if
+        its device name is an exact match; otherwise the full scan decides.
+        """
+        target = self.device_name.lower()
+        needle = target.replace(' ', '_')
+        for link in glob.glob('/dev/input/by-id/*-event-*'):
+            if needle not in os.path.basename(link).lower():
+                continue
+            path = os.path.realpath(link)
+            try:
+                device = InputDevice(path)
             except Exception as e:
-                self.logger.debug(f"Error checking device {path}: {e}")
+                self.logger.debug("Error checking device %s: %s", path, e)
                 continue
+            if device.name.lower() == target:
+                self.logger.info("Found IC Reader: %s", device.name)
+                self.logger.info("  Path: %s (%s)", device.path, link)
+                return device
+            device.close()
+        return None
 
-        # If exact match not found, try partial match
-        self.logger.warning(f"Exact match not found for '{self.device_name}', trying partial match...")
+    def _search_devices(self):
+        """Scan all input devices for the IC Reader by name, in one pass"""
+        # Search for IC Reader by exact name
+        self.logger.info("Searching for device: '%s'...", self.device_name)
+
+        target = self.device_name.lower()
+        exact = None
+        partial = None
+        seen = []  # (name, path) of non-matching devices, for the not-found listing
 
-        for path in evdev.list_devices():
+        # Devices without keys are skipped before opening them; each
+        # remaining device is opened once
+        for path in _key_device_paths():
             try:
                 device = InputDevice(path)
+                name = device.name.lower()
+            except Exception as e:
+                self.logger.debug("Error checking device %s: %s", path, e)
+                continue
 
-                # Partial name match
-                if self.device_name.lower() in device.name.lower():
-                    self.logger.info(f"Found device (partial match): {device.name}")
-                    self.logger.info(f"  Path: {device.path}")
-                    return device
+            # Exact name match (case-insensitive) wins outright
+            if name == target:
+                exact = device
+                break
 
-            except Exception:
+            # Remember the first partial match in case no exact one exists
+            if partial is None and target in name:
+                partial = device
                 continue
 
+            seen.append((device.name, device.path))
+            device.close()
+
+        if exact:
+            if partial:
+                partial.close()
+            self.logger.info("Found IC Reader: %s", exact.name)
+            self.logger.info("  Path: %s", exact.path)
+            self.logger.info("  Phys: %s", exact.phys)
+            return exact
+
+        self.logger.warning("Exact match not found for '%s', trying partial match...", self.device_name)
+        if partial:
+            self.logger.info("Found device (partial match): %s", partial.name)
+            self.logger.info("  Path: %s", partial.path)
+            return partial
+
         # List all devices if nothing found
-        self.logger.error(f"Device '{self.device_name}' not found!")
+        self.logger.error("Device '%s' not found!", self.device_name)
         self.logger.info("Available input devices:")
-        for path in evdev.list_devices():
-            try:
-                device = InputDevice(path)
-                caps = device.capabilities()
-                if evdev.ecodes.EV_KEY in caps:
-                    self.logger.info(f"  - '{device.name}' ({device.path})")
-            except Exception:
-                pass
+        for name, path in seen:
+            self.logger.info("  - '%s' (%s)", name, path)
 
         return None
 
@@ -174,19 +379,14 @@ class USBRFIDReader:
             return []
 
         devices = []
-        for path in evdev.list_devices():
-            try:
-                device = InputDevice(path)
-                caps = device.capabilities()
-                has_keys = evdev.ecodes.EV_KEY in caps
+        for path, device, has_keys, error in _enumerate_input_devices():
+            if device:
                 devices.append({
                     'path': device.path,
                     'name': device.name,
                     'phys': device.phys,
                     'has_keyboard': has_keys
                 })
-            except Exception:
-                pass
 
         return devices
 
@@ -206,16 +406,39 @@ class USBRFIDReader:
         try:
             self.device.grab()
             self.grabbed = True
-            self.logger.info(f"EXCLUSIVE ACCESS GRANTED: {self.device.name}")
+            self.logger.info("EXCLUSIVE ACCESS GRANTED: %s", self.device.name)
             self.logger.info("Keystrokes from this device will NOT go to other applications")
+            self._mask_events()
             return True
         except IOError as e:
-            self.logger.error(f"Failed to grab device (need root/input group): {e}")
+            self.logger.error("Failed to grab device (need root/input group): %s", e)
             return False
         except Exception as e:
-            self.logger.error(f"Error grabbing device: {e}")
+            self.logger.error("Error grabbing device: %s", e)
             return False
 
+    def _mask_events(self):
+        """
+        Have the kernel drop events the read loop would ignore.
+
+        Only key events for card characters and Enter are delivered, plus
+        the SYN reports evdev needs to hand events to readers; scan code
+        (EV_MSC) events and other keys are never copied out. Needs
+        EVIOCSMASK (Linux 4.4+); without it all events still arrive and
+        are filtered in read_card().
+        """
+        masks = (
+            # The EV_SYN mask selects event types
+            (ecodes.EV_SYN, _bitmask((ecodes.EV_SYN, ecodes.EV_KEY), ecodes.EV_MAX + 1)),
+            (ecodes.EV_KEY, _bitmask(list(KEY_MAP) + [ecodes.KEY_ENTER], ecodes.KEY_MAX + 1)),
+        )
+        try:
+            for ev_type, mask in masks:
+                fcntl.ioctl(self.device.fd, _EVIOCSMASK,
+                            struct.pack('IIQ', ev_type, len(mask), ctypes.addressof(mask)))
+        except OSError as e:
+            self.logger.debug("Kernel event mask not applied: %s", e)
+
     def ungrab_device(self):
         """Release exclusive access to the device"""
         if self.device and self.grabbed:
@@ -224,94 +447,231 @@ class USBRFIDReader:
                 self.grabbed = False
                 self.logger.info("Released exclusive access to device")
             except Exception as e:
-                self.logger.error(f"Error releasing device: {e}")
+                self.logger.error("Error releasing device: %s", e)
 
-    def read_card(self):
+    def read_card(self, timeout=None):
         """
         Read card ID from the IC Reader.
 
         Accumulates keystrokes until Enter is pressed, then returns the full card ID.
+        Every event available on wakeup is processed; when one batch holds
+        several cards, the later ones are returned by the following calls
+        without waiting on the device.
+
+        Args:
+            timeout: Seconds to wait for input; None blocks until the reader sends events
 
         Returns:
             str or None: The card ID or None if no complete card was read yet
         """
+        if self._cards:
+            return self._cards.popleft()
+
         if not self.device:
             return None
 
         try:
-            import select
-
-            # Wait for input (100ms timeout)
-            r, w, x = select.select([self.device.fd], [], [], 0.1)
-
-            if not r:
+            poller = self._poller
+            if poller is None:
+                poller = self._poller = select.poll()
+                poller.register(self.device.fd, select.POLLIN)
+
+            # Sleep in the kernel until the reader has events
+            ready = poller.poll(None if timeout is None else timeout * 1000)
+            if not ready:
                 return None
+            if ready[0][1] & _POLL_FAILED:
+                self._device_lost("device hung up")
+                return None
+
+            # Hoisted for the per-event loop
+            key_table = KEY_TABLE
+            ev_key = ecodes.EV_KEY
+            key_enter = ecodes.KEY_ENTER
+            cards = self._cards
+            buffer = self.card_buffer
+            append = buffer.append
 
             # Read all available events
             for event in self.device.read():
-                if event.type == evdev.ecodes.EV_KEY:
-                    key_event = categorize(event)
-
-                    # Only process key down events (value=1)
-                    if key_event.keystate == 1:
-                        keycode = key_event.scancode
-
-                        # Enter key = end of card data
-                        if keycode == evdev.ecodes.KEY_ENTER:
-                            if self.card_buffer:
-                                card_id = ''.join(self.card_buffer)
-                                self.card_buffer = []  # Clear buffer
-
-                                # Debounce check
-                                current_time = time.time()
-                                if card_id == self.last_card_id and \
-                                   (current_time - self.last_read_time) < self.debounce_time:
-                                    self.logger.debug(f"Ignoring duplicate: {card_id}")
-                                    return None
-
-                                self.last_card_id = card_id
-                                self.last_read_time = current_time
-                                self.logger.info(f"Card scanned: {card_id}")
-                                return card_id
-                            # Empty buffer on Enter, just clear
-                            self.card_buffer = []
-
-                        # Map keycode to character and add to buffer
-                        elif keycode in self.KEY_MAP:
-                            self.card_buffer.append(self.KEY_MAP[keycode])
+                # Only process key down events (value=1); the raw event
+                # carries everything needed, no KeyEvent wrapper
+                if event.type == ev_key and event.value == 1:
+                    keycode = event.code
+
+                    # Enter key = end of card data
+                    if keycode == key_enter:
+                        if buffer:
+                            card_id = self._accept_card()
+                            if card_id:
+                                cards.append(card_id)
+
+                    # Map keycode to character and add to buffer
+                    else:
+                        char = key_table[keycode]
+                        if char:
+                            append(char)
+
+            return cards.popleft() if cards else None
+
+        except BlockingIOError:
+            # Woken without events (e.g. drained elsewhere); nothing to do
+            return None
 
+        except OSError as e:
+            if e.errno in (errno.ENODEV, errno.EIO):
+                self._device_lost(e)
+                return None
+            self.logger.error("Error reading card: %s", e)
+            self.card_buffer.clear()
             return None
 
         except Exception as e:
-            self.logger.error(f"Error reading card: {e}")
-            self.card_buffer = []  # Clear buffer on error
+            self.logger.error("Error reading card: %s", e)
+            self.card_buffer.clear()  # Clear buffer on error
             return None
 
+    async def read_cards(self):
+        """
+        Yield an attendance record for each card scanned.
+
+        Async alternative to start_reading() for callers running an asyncio
+        event loop: the loop's selector waits on the reader alongside any
+        other I/O, through evdev's async_read_loop(). Ends when the device
+        fails or is closed.
+        """
+        if not self.device:
+            return
+
+        key_table = KEY_TABLE
+        ev_key = ecodes.EV_KEY
+        key_enter = ecodes.KEY_ENTER
+        buffer = self.card_buffer
+        append = buffer.append
+
+        try:
+            async for event in self.device.async_read_loop():
+                if event.type == ev_key and event.value == 1:
+                    keycode = event.code
+                    if keycode == key_enter:
+                        if buffer:
+                            card_id = self._accept_card()
+                            if card_id:
+                                yield self.create_attendance_record(card_id)
+                    else:
+                        char = key_table[keycode]
+                        if char:
+                            append(char)
+        except OSError as e:
+            self.logger.error("Error reading card: %s", e)
+            self.card_buffer.clear()
+
+    def _accept_card(self):
+        """
+        Take the buffered card ID at Enter.
+
+        Returns:
+            str or None: The card ID, or None if it repeats the last card
+            within the debounce time
+        """
+        card_id = self.card_buffer.decode('ascii')
+        self.card_buffer.clear()
+
+        # Debounce check on the monotonic clock, so wall-clock
+        # adjustments cannot let a duplicate through
+        now_ns = time.monotonic_ns()
+        if card_id == self.last_card_id and \
+           now_ns - self.last_read_ns < self._debounce_ns:
+            self.logger.debug("Ignoring duplicate: %s", card_id)
+            return None
+
+        self.last_card_id = card_id
+        self.last_read_ns = now_ns
+        self.logger.info("Card scanned: %s", card_id)
+        return card_id
+
     def create_attendance_record(self, card_id):
         """Create attendance record from card ID"""
-        record = {
-            'card_id': str(card_id),
-            'timestamp': datetime.utcnow().isoformat() + 'Z',
-            'device_id': self.config['device']['id'],
-            'device_name': self.config['device']['name'],
-            'location': self.config['device']['location'],
-            'synced': False
-        }
+        record = self._record_template.copy()
+        record['card_id'] = str(card_id)
+        record['timestamp'] = _utc_timestamp()
         return record
 
+    def _device_lost(self, reason):
+        """Close a reader that was unplugged so the reader thread can look for it again"""
+        self.logger.warning("IC Reader disconnected: %s", reason)
+        self._lost_signature = _input_dir_signature()
+        self._poller = None
+        self.grabbed = False
+        self.card_buffer.clear()
+        if self.device:
+            try:
+                self.device.close()
+            except Exception:
+                pass
+        self.device = None
+
+    def _reconnect(self):
+        """
+        Find and grab the reader again after it was lost.
+
+        Returns:
+            bool: True once the reader is open and grabbed
+        """
+        # Until a device node appears or disappears the reader cannot be back
+        signature = _input_dir_signature()
+        if signature is not None and signature == self._lost_signature:
+            return False
+        self._lost_signature = signature
+
+        self.device = self.find_ic_reader()
+        if not self.device:
+            return False
+        if not self.grab_device():
+            self._device_lost("could not grab device")
+            return False
+        self.logger.info("IC Reader reconnected")
+        return True
+
+    def _reader_loop(self):
+        """Read cards on the reader thread and queue their records until stopped"""
+        read_card = self.read_card
+        create_record = self.create_attendance_record
+        put = self._records.put
+        stop_event = self._stop_event
+
+        while not stop_event.is_set():
+            if self.device is None:
+                # Unplugged: wait before each search instead of spinning
+                if stop_event.wait(RECONNECT_INTERVAL):
+                    break
+                self._reconnect()
+                continue
+
+            card_id = read_card(timeout=READ_POLL_INTERVAL)
+            if card_id:
+                put(create_record(card_id))
+
     def start_reading(self, callback):
         """
         Start continuous card reading with callback.
 
+        Device reads run on a separate thread; the callback is called on
+        the calling thread, so slow callbacks do not delay reading.
+        Returns after stop() or Ctrl+C.
+
         Args:
             callback: Function to call when a card is read, receives attendance record
         """
-        self.logger.info("=" * 60)
+        verbose_banners = self.config.get('logging', {}).get('verbose_banners', False)
+        if verbose_banners:
+            self.logger.info(_BANNER)
         self.logger.info("Starting IC Reader Service")
-        self.logger.info(f"Device Name: {self.config['device']['name']}")
-        self.logger.info(f"Location: {self.config['device']['location']}")
-        self.logger.info(f"Looking for: '{self.device_name}'")
-        self.logger.info("=" * 60)
+        self.logger.info("Device Name: %s", self.config['device']['name'])
+        self.logger.info("Location: %s", self.config['device']['location'])
+        self.logger.info("Looking for: '%s'", self.device_name)
+        if verbose_banners:
+            self.logger.info(_BANNER)
 
         if not EVDEV_AVAILABLE:
             self.logger.error("evdev not available! Install with: pip install evdev")
@@ -326,27 +686,48 @@ class USBRFIDReader:
             self.logger.error("  3. The device name in config matches your reader")
             return
 
-        self.logger.info("=" * 60)
+        if verbose_banners:
+            self.logger.info(_BANNER)
         self.logger.info("Ready to scan cards...")
         self.logger.info("Press Ctrl+C to stop")
-        self.logger.info("=" * 60)
+        if verbose_banners:
+            self.logger.info(_BANNER)
 
+        self._stop_event.clear()
+        self._reader_thread = threading.Thread(
+            target=self._reader_loop, name='ICReader', daemon=True
+        )
+        self._reader_thread.start()
+
+        get = self._records.get
         try:
-            while True:
-                card_id = self.read_card()
-                if card_id:
-                    record = self.create_attendance_record(card_id)
-                    callback(record)
-                time.sleep(0.01)  # Small delay
+            while not self._stop_event.is_set():
+                try:
+                    record = get(timeout=READ_POLL_INTERVAL)
+                except queue.Empty:
+                    continue
+                callback(record)
 
         except KeyboardInterrupt:
             self.logger.info("\nStopping IC Reader service...")
         finally:
             self.cleanup()
 
+    def stop(self):
+        """Ask start_reading() to return; safe to call from any thread"""
+        self._stop_event.set()
+
     def cleanup(self):
         """Cleanup resources"""
+        # Let the reader thread leave poll() before the device is closed
+        self._stop_event.set()
+        thread = self._reader_thread
+        if thread and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout=READ_POLL_INTERVAL * 2)
+        self._reader_thread = None
+
         self.ungrab_device()
+        self._poller = None
         if self.device:
             try:
                 self.device.close()
@@ -369,22 +750,18 @@ def list_all_devices():
     print("AVAILABLE INPUT DEVICES")
     print("=" * 70)
 
-    for path in evdev.list_devices():
-        try:
-            device = InputDevice(path)
-            caps = device.capabilities()
-            has_keys = evdev.ecodes.EV_KEY in caps
+    for path, device, has_keys, error in _enumerate_input_devices():
+        if error:
+            print(f"Error reading {path}: {error}")
+            continue
 
-            print(f"\nName: '{device.name}'")
-            print(f"  Path: {device.path}")
-            print(f"  Phys: {device.phys}")
-            print(f"  Has keyboard events: {has_keys}")
+        print(f"\nName: '{device.name}'")
+        print(f"  Path: {device.path}")
+        print(f"  Phys: {device.phys}")
+        print(f"  Has keyboard events: {has_keys}")
 
-            if has_keys and ('reader' in device.name.lower() or 'ic' in device.name.lower()):
-                print("  >>> THIS IS LIKELY YOUR IC READER <<<")
-
-        except Exception as e:
-            print(f"Error reading {path}: {e}")
+        if has_keys and _READER_HINT_RE.search(device.name):
+            print("  >>> THIS IS LIKELY YOUR IC READER <<<")
 
     print("\n" + "=" * 70)
     print("To use a specific device, set 'device_name' in config.json")
@@ -1,50 +1,180 @@
-from flask import Flask, render_template, jsonify, request, send_file, Response
+from flask import Flask, render_template, jsonify, request, send_file, Response, make_response
 from flask_cors import CORS
 import json
-import logging
-import io
 import csv
+import re
+import mmap
 from datetime import datetime, timedelta
 from pathlib import Path
 import sys
 import os
-import subprocess
+import socket
 import platform
+import atexit
+import functools
+import threading
+import time
 
 # Add parent directory to path
 current_dir = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(current_dir)
 sys.path.insert(0, parent_dir)
 
+# waitress is optional: it serves requests on a thread pool instead of
+# Flask's development server
+try:
+    from waitress import serve as waitress_serve
+    WAITRESS_AVAILABLE = True
+except ImportError:
+    WAITRESS_AVAILABLE = False
+
 from services.offline_storage import OfflineStorage
 from services.api_sync import APISync
+from services.logging_setup import get_logger
+from services.config import load_config as _load_config_file, clear_config_cache
+from services import json_provider
+
 
 app = Flask(__name__, static_folder='static', static_url_path='/static')
+# jsonify() through orjson when installed (see services/json_provider.py)
+json_provider.install(app)
 CORS(app)
 
 # Initialize services
 config_path = os.path.join(parent_dir, 'config/config.json')
 storage = OfflineStorage(config_path)
 api_sync = APISync(config_path)
+atexit.register(api_sync.close)
+
+# Backend reachability is probed on its own schedule; requests read the result
+DEFAULT_BACKEND_CHECK_INTERVAL = 15
+api_sync.start_health_monitor(
+    api_sync.config.get('web', {}).get('backend_check_interval', DEFAULT_BACKEND_CHECK_INTERVAL)
+)
+
+# Behind a proxy that honours X-Sendfile, let it send exported files itself
+app.config['USE_X_SENDFILE'] = api_sync.config.get('web', {}).get('use_x_sendfile', False)
 
 # Setup logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger('WebPortal')
+logger = get_logger('WebPortal')
+
+
+# "2024-01-15 08:30:00,123 - Logger - LEVEL - Message", split at the first three " - "
+_LOG_LINE_RE = re.compile(r'(.*?) - (.*?) - (.*?) - (.*)')
+
+# Seconds the dashboard may reuse slow-changing polled responses (system info,
+# log list) without asking again. Record counts are not cached: the dashboard
+# re-reads them right after a sync or clear
+CLIENT_CACHE_SECONDS = 5
+
+# Seconds a system info snapshot is served before /proc etc. are read again
+DEFAULT_SYSTEM_INFO_TTL = 5
+
+# Last system info snapshot, shared by /api/status and /api/system
+_sys_info_cache = {'ts': 0.0, 'data': None}
+
+
+# path -> descriptor for the /proc and /sys files polled by get_system_info
+_PROC_FDS = {}
+# Serializes use of those descriptors across request threads
+_proc_fds_lock = threading.Lock()
+
+# Host facts that cannot change while the portal runs
+_STATIC_SYSTEM_INFO = {
+    'hostname': platform.node(),
+    'platform': platform.system(),
+    'architecture': platform.machine(),
+    'python_version': platform.python_version(),
+}
+
+
+def _read_proc(path):
+    """
+    Read a small /proc or /sys file through a descriptor kept open across calls.
+    pread at offset 0 makes the kernel regenerate the contents, so each call
+    sees current values without a fresh open(). Returns None if unreadable.
+    """
+    # Held for the read too: once one thread pops and closes a descriptor,
+    # no other may read or close that number, which the process may reuse
+    with _proc_fds_lock:
+        fd = _PROC_FDS.get(path)
+        try:
+            if fd is None:
+                fd = _PROC_FDS[path] = os.open(path, os.O_RDONLY)
+            return os.pread(fd, 4096, 0).decode()
+        except OSError:
+            if fd is not None:
+                del _PROC_FDS[path]
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+            return None
+
+
+# Primary IPv4 address, resolved once; None until a lookup succeeds
+_ip_address = None
+
+
+def get_ip_address():
+    """
+    Primary IPv4 address of this device, looked up in-process and cached.
+    Connecting a UDP socket only picks the outgoing interface; no packet
+    is sent. Without a default route, fall back to the hostname's addresses.
+    """
+    global _ip_address
+    if _ip_address:
+        return _ip_address
+
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.connect(('8.8.8.8', 80))
+            _ip_address = sock.getsockname()[0]
+    except OSError:
+        try:
+            addrs = socket.getaddrinfo(socket.gethostname(), None, socket.AF_INET)
+            ips = [a[4][0] for a in addrs if not a[4][0].startswith('127.')]
+            _ip_address = ips[0] if ips else None
+        except OSError:
+            _ip_address = None
+    return _ip_address
+
+
+def cache_for(seconds):
+    """Let the browser reuse a view's response for `seconds` instead of re-polling"""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            response = make_response(view(*args, **kwargs))
+            response.cache_control.private = True
+            response.cache_control.max_age = seconds
+            return response
+        return wrapper
+    return decorator
 
 
 def load_config():
-    """Load configuration"""
-    with open(config_path, 'r') as f:
-        return json.load(f)
+    """
+    Load configuration (cached until config.json changes).
+    The returned dict is shared; copy before modifying.
+    """
+    return _load_config_file(config_path)
+
+
+def get_system_info_cached():
+    """System info, re-read at most once per web.system_info_ttl seconds"""
+    ttl = load_config().get('web', {}).get('system_info_ttl', DEFAULT_SYSTEM_INFO_TTL)
+    now = time.monotonic()
+    if _sys_info_cache['data'] is None or now - _sys_info_cache['ts'] >= ttl:
+        _sys_info_cache['data'] = get_system_info()
+        _sys_info_cache['ts'] = now
+    return _sys_info_cache['data']
 
 
 def get_system_info():
     """Get Raspberry Pi system information"""
     info = {
-        'hostname': platform.node(),
-        'platform': platform.system(),
-        'architecture': platform.machine(),
-        'python_version': platform.python_version(),
+        **_STATIC_SYSTEM_INFO,
         'cpu_temp': None,
         'cpu_usage': None,
         'memory_usage': None,
@@ -55,62 +185,55 @@ def get_system_info():
 
     try:
         # CPU Temperature (Raspberry Pi specific)
-        if os.path.exists('/sys/class/thermal/thermal_zone0/temp'):
-            with open('/sys/class/thermal/thermal_zone0/temp', 'r') as f:
-                temp = int(f.read().strip()) / 1000
-                info['cpu_temp'] = round(temp, 1)
+        data = _read_proc('/sys/class/thermal/thermal_zone0/temp')
+        if data:
+            temp = int(data.strip()) / 1000
+            info['cpu_temp'] = round(temp, 1)
 
         # CPU Usage
-        if os.path.exists('/proc/stat'):
-            with open('/proc/stat', 'r') as f:
-                cpu_line = f.readline()
-                cpu_times = list(map(int, cpu_line.split()[1:]))
-                idle = cpu_times[3]
-                total = sum(cpu_times)
-                info['cpu_usage'] = round(100 * (1 - idle / total), 1)
+        data = _read_proc('/proc/stat')
+        if data:
+            cpu_line = data.split('\n', 1)[0]
+            cpu_times = list(map(int, cpu_line.split()[1:]))
+            idle = cpu_times[3]
+            total = sum(cpu_times)
+            info['cpu_usage'] = round(100 * (1 - idle / total), 1)
 
         # Memory Usage
-        if os.path.exists('/proc/meminfo'):
-            with open('/proc/meminfo', 'r') as f:
-                lines = f.readlines()
-                mem_total = int(lines[0].split()[1])
-                mem_available = int(lines[2].split()[1])
-                info['memory_usage'] = {
-                    'total_mb': round(mem_total / 1024, 1),
-                    'used_mb': round((mem_total - mem_available) / 1024, 1),
-                    'percent': round(100 * (1 - mem_available / mem_total), 1)
-                }
+        data = _read_proc('/proc/meminfo')
+        if data:
+            lines = data.split('\n', 3)
+            mem_total = int(lines[0].split()[1])
+            mem_available = int(lines[2].split()[1])
+            info['memory_usage'] = {
+                'total_mb': round(mem_total / 1024, 1),
+                'used_mb': round((mem_total - mem_available) / 1024, 1),
+                'percent': round(100 * (1 - mem_available / mem_total), 1)
+            }
 
         # Disk Usage
-        if os.path.exists('/'):
-            statvfs = os.statvfs('/')
-            total = statvfs.f_frsize * statvfs.f_blocks
-            free = statvfs.f_frsize * statvfs.f_bavail
-            used = total - free
-            info['disk_usage'] = {
-                'total_gb': round(total / (1024 ** 3), 1),
-                'used_gb': round(used / (1024 ** 3), 1),
-                'percent': round(100 * used / total, 1)
-            }
+        statvfs = os.statvfs('/')
+        total = statvfs.f_frsize * statvfs.f_blocks
+        free = statvfs.f_frsize * statvfs.f_bavail
+        used = total - free
+        info['disk_usage'] = {
+            'total_gb': round(total / (1024 ** 3), 1),
+            'used_gb': round(used / (1024 ** 3), 1),
+            'percent': round(100 * used / total, 1)
+        }
 
         # Uptime
-        if os.path.exists('/proc/uptime'):
-            with open('/proc/uptime', 'r') as f:
-                uptime_seconds = float(f.readline().split()[0])
-                days = int(uptime_seconds // 86400)
-                hours = int((uptime_seconds % 86400) // 3600)
-                minutes = int((uptime_seconds % 3600) // 60)
-                info['uptime'] = f"{days}d {hours}h {minutes}m"
-                info['uptime_seconds'] = int(uptime_seconds)
+        data = _read_proc('/proc/uptime')
+        if data:
+            uptime_seconds = float(data.split(None, 1)[0])
+            days = int(uptime_seconds // 86400)
+            hours = int((uptime_seconds % 86400) // 3600)
+            minutes = int((uptime_seconds % 3600) // 60)
+            info['uptime'] = f"{days}d {hours}h {minutes}m"
+            info['uptime_seconds'] = int(uptime_seconds)
 
         # IP Address
-        try:
-            result = subprocess.run(['hostname', '-I'], capture_output=True, text=True, timeout=5)
-            if result.returncode == 0:
-                ips = result.stdout.strip().split()
-                info['ip_address'] = ips[0] if ips else None
-        except Exception:
-            pass
+        info['ip_address'] = get_ip_address()
 
     except Exception as e:
         logger.error(f"Error getting system info: {e}")
@@ -118,15 +241,59 @@ def get_system_info():
     return info
 
 
+# CSV export rows whose fields need no quoting are formatted directly;
+# anything else goes through csv.writer
+_CSV_ROW = '{},{},{},{},{},{}\r\n'
+_CSV_NEEDS_QUOTING = re.compile(r'[,"\r\n]').search
+_YES_NO = ('No', 'Yes')
+
+
+class _RowSink:
+    """File-like target for csv.writer that returns each row instead of storing it"""
+
+    def write(self, value):
+        return value
+
+
+def _chunked(pieces, size=65536):
+    """Join small string pieces into chunks of about `size` characters for streaming"""
+    buf = []
+    buffered = 0
+    for piece in pieces:
+        buf.append(piece)
+        buffered += len(piece)
+        if buffered >= size:
+            yield ''.join(buf)
+            buf = []
+            buffered = 0
+    if buf:
+        yield ''.join(buf)
+
+
 def read_log_file(log_path, lines=100):
     """Read last N lines from a log file"""
     try:
         if not os.path.exists(log_path):
             return []
 
-        with open(log_path, 'r') as f:
-            all_lines = f.readlines()
-            return all_lines[-lines:] if len(all_lines) > lines else all_lines
+        if lines <= 0:
+            return []
+
+        # Map the file and step back from EOF over N newlines, so only the
+        # tail is copied and decoded however large the log has grown
+        with open(log_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                end = len(mm)
+                pos = end - 1 if mm[end - 1] == 0x0A else end  # ignore the final newline
+                for _ in range(lines):
+                    pos = mm.rfind(b'\n', 0, pos)
+                    if pos < 0:
+                        break
+                tail = mm[pos + 1:end]
+
+        return tail.decode('utf-8', errors='replace').split('\n')
     except Exception as e:
         logger.error(f"Error reading log file {log_path}: {e}")
         return []
@@ -143,9 +310,10 @@ def get_status():
     """Get comprehensive system status"""
     config = load_config()
     stats = storage.get_stats()
-    is_online = api_sync.check_connection()
+    # Kept current by the health monitor; no network call per poll
+    is_online = api_sync.is_online
     sync_config = api_sync.get_sync_config()
-    system_info = get_system_info()
+    system_info = get_system_info_cached()
 
     return jsonify({
         'device': config['device'],
@@ -167,22 +335,9 @@ def get_records():
     synced_filter = request.args.get('synced', None)
     search = request.args.get('search', '')
 
-    records = storage.get_all_records()
-
-    # Filter by synced status
-    if synced_filter is not None:
-        synced_bool = synced_filter.lower() == 'true'
-        records = [r for r in records if r.get('synced', False) == synced_bool]
-
-    # Search by card_id
-    if search:
-        records = [r for r in records if search.lower() in r.get('card_id', '').lower()]
-
-    # Sort by timestamp descending
-    records.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
-
-    total = len(records)
-    paginated_records = records[offset:offset + limit]
+    # Filter by synced status and card_id, newest first, one page only
+    synced = synced_filter.lower() == 'true' if synced_filter is not None else None
+    paginated_records, total = storage.query(synced=synced, search=search, limit=limit, offset=offset)
 
     return jsonify({
         'records': paginated_records,
@@ -206,30 +361,20 @@ def get_unsynced_records():
 @app.route('/api/records/stats')
 def get_records_stats():
     """Get detailed records statistics"""
-    records = storage.get_all_records()
-
-    # Calculate stats
-    today = datetime.utcnow().date()
-    today_count = 0
-    last_hour_count = 0
-    hourly_distribution = {str(i).zfill(2): 0 for i in range(24)}
-
+    # Calculate stats; timestamps are ISO strings, so the time windows are
+    # text ranges counted in SQL over the timestamp index
     now = datetime.utcnow()
+    today = now.date()
     one_hour_ago = now - timedelta(hours=1)
+    hourly_distribution = {str(i).zfill(2): 0 for i in range(24)}
 
-    for record in records:
-        try:
-            ts = datetime.fromisoformat(record['timestamp'].replace('Z', '+00:00'))
-            ts_naive = ts.replace(tzinfo=None)
-
-            if ts_naive.date() == today:
-                today_count += 1
-                hourly_distribution[str(ts_naive.hour).zfill(2)] += 1
+    by_hour = storage.count_by_hour(today.isoformat(), (today + timedelta(days=1)).isoformat())
+    for hour, count in by_hour.items():
+        if hour in hourly_distribution:
+            hourly_distribution[hour] += count
+    today_count = sum(hourly_distribution.values())
 
-            if ts_naive >= one_hour_ago:
-                last_hour_count += 1
-        except Exception:
-            pass
+    last_hour_count = storage.count_since(one_hour_ago.isoformat())
 
     stats = storage.get_stats()
 
@@ -248,7 +393,8 @@ def get_records_stats():
 @app.route('/api/sync/trigger', methods=['POST'])
 def trigger_sync():
     """Manually trigger sync"""
-    if not api_sync.check_connection():
+    # Only probe when the monitor last saw the backend offline
+    if not (api_sync.is_online or api_sync.check_connection()):
         return jsonify({
             'success': False,
             'message': 'Backend is offline'
@@ -282,18 +428,49 @@ def get_sync_config():
     return jsonify(api_sync.get_sync_config())
 
 
-@app.route('/api/config')
-def get_config():
-    """Get configuration (excluding sensitive data)"""
+# Masked copy of the shared config, rebuilt only when load_config() returns a new dict
+_safe_config_cache = {'source': None, 'data': None}
+
+
+def get_safe_config():
+    """Config with the API key masked, sharing every section but 'server'"""
     config = load_config()
+    if _safe_config_cache['source'] is config:
+        return _safe_config_cache['data']
+
+    safe_config = config
+    server = config.get('server')
+    if server and 'api_key' in server:
+        api_key = server['api_key']
+        masked = f"***{api_key[-8:]}" if len(api_key) > 8 else '***HIDDEN***'
+        safe_config = {**config, 'server': {**server, 'api_key': masked}}
 
-    # Remove sensitive information
-    safe_config = config.copy()
-    if 'server' in safe_config and 'api_key' in safe_config['server']:
-        api_key = safe_config['server']['api_key']
-        safe_config['server']['api_key'] = f"***{api_key[-8:]}" if len(api_key) > 8 else '***HIDDEN***'
+    _safe_config_cache['source'] = config
+    _safe_config_cache['data'] = safe_config
+    return safe_config
 
-    return jsonify(safe_config)
+
+@app.route('/api/config')
+def get_config():
+    """Get configuration (excluding sensitive data)"""
+    # The file's mtime and size identify the config version; a client that
+    # already has it gets 304 without the config being loaded or encoded
+    try:
+        st = os.stat(config_path)
+        etag = f"{st.st_mtime_ns:x}-{st.st_size:x}"
+    except OSError:
+        etag = None
+    if etag and etag in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+
+    response = jsonify(get_safe_config())
+    if etag:
+        response.set_etag(etag)
+        # Stored, but revalidated on every use
+        response.cache_control.no_cache = True
+    return response
 
 
 @app.route('/api/config', methods=['POST'])
@@ -314,6 +491,8 @@ def update_config():
         # Save configuration
         with open(config_path, 'w') as f:
             json.dump(new_config, f, indent=2)
+        # mtime may not change on coarse-timestamp filesystems (e.g. FAT)
+        clear_config_cache()
 
         return jsonify({
             'success': True,
@@ -348,7 +527,8 @@ def clear_synced_storage():
 @app.route('/api/device/register', methods=['POST'])
 def register_device():
     """Register device with backend"""
-    if not api_sync.check_connection():
+    # Only probe when the monitor last saw the backend offline
+    if not (api_sync.is_online or api_sync.check_connection()):
         return jsonify({
             'success': False,
             'message': 'Backend is offline'
@@ -383,29 +563,23 @@ def get_logs():
 
     # Parse log lines into structured format
     parsed_logs = []
+    match_line = _LOG_LINE_RE.match
     for line in log_lines:
         line = line.strip()
         if not line:
             continue
 
         # Try to parse standard log format: 2024-01-15 08:30:00,123 - Logger - LEVEL - Message
-        try:
-            parts = line.split(' - ', 3)
-            if len(parts) >= 4:
-                parsed_logs.append({
-                    'timestamp': parts[0],
-                    'logger': parts[1],
-                    'level': parts[2],
-                    'message': parts[3]
-                })
-            else:
-                parsed_logs.append({
-                    'timestamp': None,
-                    'logger': None,
-                    'level': 'INFO',
-                    'message': line
-                })
-        except Exception:
+        match = match_line(line)
+        if match:
+            timestamp, name, level, message = match.groups()
+            parsed_logs.append({
+                'timestamp': timestamp,
+                'logger': name,
+                'level': level,
+                'message': message
+            })
+        else:
             parsed_logs.append({
                 'timestamp': None,
                 'logger': None,
@@ -422,22 +596,28 @@ def get_logs():
 
 
 @app.route('/api/logs/available')
+@cache_for(CLIENT_CACHE_SECONDS)
 def get_available_logs():
     """Get list of available log files"""
     logs_dir = os.path.join(parent_dir, 'logs')
     available = []
 
-    if os.path.exists(logs_dir):
-        for filename in os.listdir(logs_dir):
-            if filename.endswith('.log'):
-                filepath = os.path.join(logs_dir, filename)
-                stat = os.stat(filepath)
-                available.append({
-                    'name': filename.replace('.log', ''),
-                    'filename': filename,
-                    'size_kb': round(stat.st_size / 1024, 1),
-                    'modified': datetime.fromtimestamp(stat.st_mtime).isoformat()
-                })
+    # scandir yields names and file types from one directory read; only
+    # the .log files are stat'ed
+    try:
+        with os.scandir(logs_dir) as entries:
+            for entry in entries:
+                filename = entry.name
+                if filename.endswith('.log') and entry.is_file():
+                    stat = entry.stat()
+                    available.append({
+                        'name': filename.replace('.log', ''),
+                        'filename': filename,
+                        'size_kb': round(stat.st_size / 1024, 1),
+                        'modified': datetime.fromtimestamp(stat.st_mtime).isoformat()
+                    })
+    except FileNotFoundError:
+        pass
 
     return jsonify({'logs': available})
 
@@ -448,41 +628,42 @@ def export_records():
     format_type = request.args.get('format', 'csv')
     synced_filter = request.args.get('synced', None)
 
-    records = storage.get_all_records()
-
-    # Filter by synced status
-    if synced_filter is not None:
-        synced_bool = synced_filter.lower() == 'true'
-        records = [r for r in records if r.get('synced', False) == synced_bool]
-
-    # Sort by timestamp
-    records.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
+    # Filter by synced status, newest first
+    synced = synced_filter.lower() == 'true' if synced_filter is not None else None
+    records, _ = storage.query(synced=synced)
 
     if format_type == 'csv':
-        # Create CSV
-        output = io.StringIO()
-        writer = csv.writer(output)
-
-        # Header
-        writer.writerow(['Card ID', 'Timestamp', 'Location', 'Device ID', 'Device Name', 'Synced'])
-
-        # Data
-        for record in records:
-            writer.writerow([
-                record.get('card_id', ''),
-                record.get('timestamp', ''),
-                record.get('location', ''),
-                record.get('device_id', ''),
-                record.get('device_name', ''),
-                'Yes' if record.get('synced', False) else 'No'
-            ])
-
-        output.seek(0)
+        # Rows are formatted as the response is sent, not into one big string
+        def generate_csv():
+            writer = csv.writer(_RowSink())
+
+            # Header
+            yield writer.writerow(['Card ID', 'Timestamp', 'Location', 'Device ID', 'Device Name', 'Synced'])
+
+            # Data
+            for record in records:
+                fields = (
+                    record.get('card_id', ''),
+                    record.get('timestamp', ''),
+                    record.get('location', ''),
+                    record.get('device_id', ''),
+                    record.get('device_name', '')
+                )
+                synced = _YES_NO[bool(record.get('synced', False))]
+                try:
+                    plain = not _CSV_NEEDS_QUOTING(''.join(fields))
+                except TypeError:  # None or non-string values
+                    plain = False
+                if plain:
+                    yield _CSV_ROW.format(*fields, synced)
+                else:
+                    yield writer.writerow([*fields, synced])
+
         timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
         filename = f'atlas_edge_records_{timestamp}.csv'
 
         return Response(
-            output.getvalue(),
+            _chunked(generate_csv()),
             mimetype='text/csv',
             headers={'Content-Disposition': f'attachment; filename={filename}'}
         )
@@ -491,8 +672,9 @@ def export_records():
         timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
         filename = f'atlas_edge_records_{timestamp}.json'
 
+        export = {'records': records, 'exported_at': datetime.utcnow().isoformat()}
         return Response(
-            json.dumps({'records': records, 'exported_at': datetime.utcnow().isoformat()}, indent=2),
+            _chunked(json.JSONEncoder(indent=2).iterencode(export)),
             mimetype='application/json',
             headers={'Content-Disposition': f'attachment; filename={filename}'}
         )
@@ -520,18 +702,44 @@ def export_logs():
     timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
     filename = f'atlas_edge_{log_type}_{timestamp}.log'
 
+    # The file is handed to the server's wsgi.file_wrapper (sendfile where
+    # supported) rather than read through Python; Range and If-None-Match
+    # requests are answered from its mtime and size
     return send_file(
         log_path,
         mimetype='text/plain',
         as_attachment=True,
-        download_name=filename
+        download_name=filename,
+        conditional=True,
+        etag=True,
+        max_age=0
     )
 
 
 @app.route('/api/system')
+@cache_for(CLIENT_CACHE_SECONDS)
 def get_system_status():
     """Get detailed system status"""
-    return jsonify(get_system_info())
+    return jsonify(get_system_info_cached())
+
+
+@app.route('/api/system/refresh', methods=['POST'])
+def refresh_system_status():
+    """Re-read system info now, including the cached IP address"""
+    global _ip_address
+    _ip_address = None
+    _sys_info_cache['data'] = None
+    return jsonify(get_system_info_cached())
+
+
+@app.route('/api/health/backend/force', methods=['POST'])
+def force_backend_check():
+    """Probe the backend now instead of waiting for the health monitor"""
+    is_online = api_sync.check_connection()
+    return jsonify({
+        'backend_online': is_online,
+        'last_check': api_sync.last_check.isoformat() if api_sync.last_check else None
+    })
 
 
 @app.route('/api/health')
@@ -555,9 +763,16 @@ def internal_error(e):
 
 
 if __name__ == '__main__':
+    # For multiple worker processes run under gunicorn instead, e.g. from web/:
+    #   gunicorn -w 2 -k gthread --threads 4 -b 0.0.0.0:8080 app:app
     config = load_config()
     port = config.get('web', {}).get('port', 8080)
     host = config.get('web', {}).get('host', '0.0.0.0')
+    threads = config.get('web', {}).get('threads', 8)
 
-    logger.info(f"Starting Atlas Edge Web Portal v2.0 on {host}:{port}")
-    app.run(host=host, port=port, debug=False)
+    if WAITRESS_AVAILABLE:
+        logger.info(f"Starting Atlas Edge Web Portal v2.0 on {host}:{port} (waitress, {threads} threads)")
+        waitress_serve(app, host=host, port=port, threads=threads)
+    else:
+        logger.info(f"Starting Atlas Edge Web Portal v2.0 on {host}:{port}")
+        app.run(host=host, port=port, debug=False, threaded=True)
@@ -0,0 +1,7 @@
+# WSGI entrypoint for the example Atlas backend
+# Run under a production server instead of the Flask dev server, e.g.:
+#   gunicorn -w 4 -k gevent -b 0.0.0.0:5000 wsgi:app
+# To let the kernel spread accept() across workers when many devices sync at once:
+#   gunicorn -w $(nproc) -k gthread --threads 8 --reuse-port -b 0.0.0.0:5000 wsgi:app
+
+from example_backend_api import app